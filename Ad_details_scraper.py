@@ -3,13 +3,11 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 import time
-import re
-from datetime import datetime
-from urllib.parse import urlparse, parse_qs 
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs, parse_qsl, urlencode
 from selenium.webdriver.common.keys import Keys
 import random
 import os
@@ -18,12 +16,22 @@ import logging
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 import tempfile
+import shutil
 import threading
+import queue
+import json
+import glob
+import zlib
+import argparse
 from collections import deque
+from contextlib import contextmanager
+import psutil
 
 # Google Sheets imports
 import gspread
 from google.oauth2.service_account import Credentials
+from google.auth.transport.requests import AuthorizedSession, Request
+from requests.adapters import HTTPAdapter
 
 # ============== CONFIGURATION =====================
 # Setup logging
@@ -37,498 +45,2477 @@ SCOPES = [
 ]
 
 # Rate limiting configuration
-RATE_LIMIT_DELAY = 2.0  # seconds between API calls
-BATCH_SIZE = 5  # number of updates per batch
+RATE_LIMIT_DELAY = 2.0  # base delay for exponential backoff on 429s
+READ_QUOTA_PER_MINUTE = int(os.getenv("SHEETS_READ_QUOTA", "60"))  # Sheets read requests per minute per user
+WRITE_QUOTA_PER_MINUTE = int(os.getenv("SHEETS_WRITE_QUOTA", "60"))  # Sheets write requests per minute per user
+QUOTA_BURST_FRACTION = 0.1  # share of the per-minute quota that may be spent in a burst
+MAX_BACKOFF = 64.0  # cap on a single backoff sleep in seconds
+BATCH_SIZE = 200  # queued cell updates that trigger a flush
+FLUSH_INTERVAL = 120.0  # seconds before queued updates are flushed regardless of size
+MAX_RANGES_PER_REQUEST = 500  # ranges sent in a single values.batchUpdate request
+WRITER_QUEUE_SIZE = 100  # scraped results buffered for the writer before scrapers block
 MAX_RETRIES = 5  # maximum retry attempts for 429 errors
 
-# Global variables for rate limiting and batch processing
-api_call_lock = threading.Lock()
+# Shared Sheets session configuration
+HTTP_POOL_SIZE = 10  # pooled HTTPS connections kept open to the Sheets API
+
+# Browser pool configuration
+PAGES_PER_DRIVER = int(os.getenv("PAGES_PER_DRIVER", "50"))  # recycle a driver after this many pages
+DRIVER_MEMORY_LIMIT_MB = int(os.getenv("DRIVER_MEMORY_LIMIT_MB", "1500"))  # recycle once Chrome RSS exceeds this
+PROFILE_ROOT = os.getenv("PROFILE_ROOT") or None  # parent for Chrome profile dirs (default: system temp)
+REUSE_WARM_PROFILES = os.getenv("REUSE_WARM_PROFILES", "0") == "1"  # keep cache and consent cookies between drivers
+PROFILE_CACHE_MB = int(os.getenv("PROFILE_CACHE_MB", "200"))  # disk cache cap per profile
+TABS_PER_BROWSER = int(os.getenv("TABS_PER_BROWSER", "1"))  # Ads Library pages loaded concurrently per Chrome
+BLOCK_HEAVY_RESOURCES = os.getenv("BLOCK_HEAVY_RESOURCES", "1") == "1"  # lean loading; set to 0 for full-detail scrapes
+PAGE_DEADLINE_SECONDS = float(os.getenv("PAGE_DEADLINE_SECONDS", "120"))  # wall-clock budget per URL before Chrome is killed
+DEADLINE_RETRY_PASSES = int(os.getenv("DEADLINE_RETRY_PASSES", "1"))  # extra passes over URLs that hit the deadline
+
+# URL patterns blocked in lean loading mode: ad creatives, media, fonts and trackers.
+# Only the results-count heading and the search box are needed from the page.
+BLOCKED_URL_PATTERNS = [
+    # Images
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.bmp', '*.ico',
+    # Video and audio
+    '*.mp4', '*.webm', '*.m4a', '*.m4v', '*.mp3', '*.m3u8', '*.mpd',
+    # Fonts
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    # Facebook creative/video CDNs (static JS/CSS lives on static.*.fbcdn.net and stays allowed)
+    '*scontent*.fbcdn.net*', '*video*.fbcdn.net*',
+    # Third-party trackers
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*connect.facebook.net*'
+]
+
+# Autoscaling: scrape concurrency moves between MIN_WORKERS and AUTOSCALE_MAX_WORKERS, starting at MAX_WORKERS
+AUTOSCALE = os.getenv("AUTOSCALE", "1") == "1"
+MIN_WORKERS = int(os.getenv("MIN_WORKERS", "1"))
+AUTOSCALE_MAX_WORKERS = int(os.getenv("AUTOSCALE_MAX_WORKERS", "4"))
+AUTOSCALE_INTERVAL = float(os.getenv("AUTOSCALE_INTERVAL", "30"))  # seconds between decisions
+AUTOSCALE_MIN_SAMPLES = 4  # pages finished in a window before latency and failure rates count
+CPU_HIGH_PERCENT = 85.0  # back off above this
+CPU_LOW_PERCENT = 60.0  # scale up only below this
+MEMORY_HIGH_PERCENT = 85.0  # system memory in use
+MEMORY_LOW_PERCENT = 70.0
+LOAD_PER_CPU_HIGH = 1.5  # 1-minute load average per core
+CHROME_RSS_LIMIT_MB = int(os.getenv("CHROME_RSS_LIMIT_MB", "6000"))  # all Chrome/chromedriver processes together
+FAILURE_RATE_HIGH = 0.2  # share of timed-out or blocked pages in a window
+LATENCY_BACKOFF_FACTOR = 1.5  # window median page time vs the best window so far
+LATENCY_SCALE_UP_FACTOR = 1.2
+
+# Freshness: skip rows whose Last Update Time is younger than this (0 disables)
+FRESHNESS_TTL_HOURS = float(os.getenv("FRESHNESS_TTL_HOURS", "0"))
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'  # format written to Last Update Time
+# Text timestamps still accepted; values Sheets parsed as dates are read as serial numbers.
+# Day/month orders are left out on purpose: 12/10/2026 reads differently per locale
+TIMESTAMP_READ_FORMATS = [TIMESTAMP_FORMAT, '%Y-%m-%d %H:%M', '%Y-%m-%d']
+SHEETS_EPOCH = datetime(1899, 12, 30)  # day 0 of Sheets date serial numbers
+
+# Ads Library URLs: query params that don't change which ads are listed, dropped when deduplicating
+IGNORED_URL_PARAMS = {'sort_data[direction]', 'sort_data[mode]', 'fbclid', 'ref', 'source'}
+ADS_LIBRARY_HOSTS = {'facebook.com', 'www.facebook.com', 'web.facebook.com', 'm.facebook.com'}
+
+# Checkpoint journal so an interrupted run resumes instead of restarting (empty disables)
+JOURNAL_FILE = os.getenv("JOURNAL_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scrape_journal.jsonl'))
+
+# Sharded runs: each shard writes its results here for the merge step ({index} and {count} are filled in)
+SHARD_RESULTS_FILE = 'shard-results-{index}-of-{count}.jsonl'
+# Journal of results a --merge has applied, so re-running it skips them. Never
+# emptied, so it must be unique to one set of shard results (empty disables)
+MERGE_JOURNAL_FILE = os.getenv("MERGE_JOURNAL_FILE", "")
+
+# Run artifacts uploaded by the workflows
+LOGS_DIR = os.getenv("LOGS_DIR", "logs")
+RUN_REPORT_FILE = os.path.join(LOGS_DIR, 'run_report.json')  # per-phase timings and API call counts
+LOG_FILE = os.path.join(LOGS_DIR, 'scraper.log')
+ADS_DATA_FILE = os.getenv("ADS_DATA_FILE", "ads_data.json")  # NDJSON: one record per scraped page, streamed as the run goes
+
+# Targets (sheet/worksheet pairs) processed by main()
+TARGETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'targets.json')
+
+# Column headers (defaults; targets.json can override the URL and ad count headers per sheet)
+URL_HEADER = 'Page Transperancy '  # Note: keeping original spelling
+AD_COUNT_HEADER = 'no.of ads By Ai'
+ZERO_STREAK_HEADER = 'Zero Ads Streak'
+LAST_UPDATE_HEADER = 'Last Update Time'
+ZERO_STREAK_DELETE_AT = 30  # consecutive zero-ad scrapes before a row is deleted
+
+# Global variables for batch processing
 pending_updates = deque()
-last_api_call_time = 0
+pending_updates_lock = threading.Lock()
+last_flush_time = time.time()
+
+# Process-wide Sheets session: one authorized client per credentials file,
+# plus cached spreadsheet and worksheet handles
+sheets_session_lock = threading.RLock()
+sheets_clients = {}  # credentials_file -> (credentials, client)
+spreadsheet_cache = {}  # (credentials_file, sheet_name) -> Spreadsheet
+worksheet_cache = {}  # (credentials_file, sheet_name, worksheet_name) -> Worksheet
+
+
+def summarize_samples(samples):
+    """Latency summary of a list of durations in seconds, reported in milliseconds."""
+    if not samples:
+        return {'n': 0}
+    ordered = sorted(samples)
+    return {
+        'n': len(ordered),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+        'total_s': round(sum(ordered), 3),
+    }
+
+
+class RunMetrics:
+    """
+    Per-run timing spans and counters, shared by every thread.
+
+    span(phase) times a block, record(phase, seconds) adds a duration measured
+    elsewhere, and count(group, key) tallies events such as Sheets API calls
+    by endpoint or 429 responses. report() summarises each phase as
+    p50/p95/max for the run report. span(phase, into=timings) also stores the
+    block's milliseconds in a per-page timings dict.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # phase -> [seconds]
+        self.counters = {}  # group -> {key: count}
+        self.started = time.time()
+
+    def record(self, phase, seconds):
+        with self.lock:
+            self.samples.setdefault(phase, []).append(seconds)
+
+    @contextmanager
+    def span(self, phase, into=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(phase, elapsed)
+            if into is not None:
+                into[phase] = round(elapsed * 1000, 2)
+
+    def count(self, group, key, n=1):
+        with self.lock:
+            counts = self.counters.setdefault(group, {})
+            counts[key] = counts.get(key, 0) + n
+
+    def report(self):
+        with self.lock:
+            samples = {phase: list(values) for phase, values in self.samples.items()}
+            counters = {group: dict(counts) for group, counts in self.counters.items()}
+        return {
+            'started': datetime.fromtimestamp(self.started).strftime(TIMESTAMP_FORMAT),
+            'duration_s': round(time.time() - self.started, 3),
+            'phases': {phase: summarize_samples(values) for phase, values in sorted(samples.items())},
+            'counters': counters,
+        }
+
+
+# Timings and API counts for the current run
+metrics = RunMetrics()
+
+
+def write_run_report(path=RUN_REPORT_FILE, **extra):
+    """Write the run's metrics, plus any extra sections, as JSON."""
+    try:
+        report = metrics.report()
+        report.update(extra)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Run report written to {path}")
+    except Exception as e:
+        logger.error(f"Error writing run report: {e}")
+
+
+class ResultsStream:
+    """
+    Append-only NDJSON stream of scrape results, one line per page attempt.
+
+    Each record is written and flushed as soon as the page is done, so
+    memory stays flat over a long run and the file can be tailed while the
+    run is in progress. Records carry the URL, page ID, the sheet rows the
+    page was fanned out to, competitor name, count, extraction strategy,
+    per-phase timings in milliseconds and any error.
+    """
+
+    def __init__(self, path, page_rows=None, append=False):
+        self.path = path
+        self.page_rows = page_rows or {}  # canonical url -> [{'target', 'row'}]
+        self.lock = threading.Lock()
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.records = 0
+
+    def record(self, url, ad_count=None, competitor_name=None, page_record=None, error=None):
+        page_record = page_record or {}
+        entry = {
+            'time': datetime.now().strftime(TIMESTAMP_FORMAT),
+            'url': url,
+            'page_id': extract_page_id(url),
+            'rows': self.page_rows.get(url, []),
+            'competitor_name': competitor_name,
+            'ad_count': ad_count,
+            'strategy': page_record.get('strategy'),
+            'state': page_record.get('state'),
+            'count_text': page_record.get('count_text'),
+            'timings_ms': page_record.get('timings', {}),
+            'error': error,
+        }
+        line = json.dumps(entry) + '\n'
+        try:
+            with self.lock:
+                self.file.write(line)
+                self.file.flush()
+                self.records += 1
+        except Exception as e:
+            logger.error(f"Error writing result for {url} to {self.path}: {e}")
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+        logger.info(f"Streamed {self.records} page results to {self.path}")
+
+
+class TokenBucket:
+    """
+    Token bucket sized to a per-minute API quota.
+
+    The refill rate plus the burst capacity never exceed the quota in any
+    60 second window. The lock only guards the token arithmetic; callers
+    sleep outside it, so one waiting thread never blocks another.
+    """
+
+    def __init__(self, name, per_minute, burst_fraction=QUOTA_BURST_FRACTION):
+        self.name = name
+        self.capacity = max(1.0, per_minute * burst_fraction)
+        self.rate = max(per_minute - self.capacity, 1.0) / 60.0  # tokens per second
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now < self.paused_until:
+                    wait_time = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                else:
+                    wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+            waited += wait_time
+        if waited:
+            metrics.record(f'rate_limit_wait.{self.name}', waited)
+
+    def pause(self, seconds):
+        """Hold every caller of this bucket for the given time (e.g. after a 429)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+# Separate buckets for the Sheets read and write quotas
+read_bucket = TokenBucket('read', READ_QUOTA_PER_MINUTE)
+write_bucket = TokenBucket('write', WRITE_QUOTA_PER_MINUTE)
+
+# gspread methods that count against the write quota; everything else is a read
+WRITE_METHODS = {
+    'update_cell', 'update', 'batch_update', 'update_cells', 'delete_rows',
+    'append_row', 'append_rows', 'insert_row', 'insert_rows', 'values_batch_update'
+}
+
+
+def is_rate_limit_error(e):
+    """Return True for Sheets 429 / RATE_LIMIT_EXCEEDED errors."""
+    response = getattr(e, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    return "429" in str(e) or "RATE_LIMIT_EXCEEDED" in str(e)
+
+
+def get_retry_after(e):
+    """Return the Retry-After delay in seconds from an API error, if the server sent one."""
+    response = getattr(e, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def rate_limited_api_call(func, *args, **kwargs):
+    """
+    Execute API call with rate limiting and retry logic for 429 errors.
+    Each call takes a token from the read or write bucket. On a 429 the
+    bucket is paused for the Retry-After time or a jittered exponential
+    backoff, and the sleep happens without holding any lock.
+    """
+    method = getattr(func, '__name__', 'unknown')
+    bucket = write_bucket if method in WRITE_METHODS else read_bucket
+    # Worksheet.batch_update and Spreadsheet.batch_update are different endpoints
+    owner = getattr(func, '__self__', None)
+    endpoint = f"{type(owner).__name__}.{method}" if owner is not None else method
+    
+    # Retry logic for 429 errors
+    for attempt in range(MAX_RETRIES):
+        bucket.acquire()
+        metrics.count('api_calls', endpoint)
+        try:
+            with metrics.span(f'sheets.{endpoint}'):
+                return func(*args, **kwargs)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                metrics.count('rate_limited', endpoint)
+                if attempt < MAX_RETRIES - 1:
+                    wait_time = get_retry_after(e)
+                    if wait_time is None:
+                        # Exponential backoff with jitter so workers don't retry in lockstep
+                        wait_time = min(MAX_BACKOFF, (2 ** attempt) * RATE_LIMIT_DELAY) * random.uniform(0.5, 1.5)
+                    bucket.pause(wait_time)
+                    logger.warning(f"Rate limit hit on {bucket.name} quota, retrying in {wait_time:.1f} seconds (attempt {attempt + 1}/{MAX_RETRIES})")
+                    continue
+                else:
+                    logger.error(f"Max retries reached for rate limit error: {e}")
+                    raise
+            else:
+                # Non-rate-limit error, raise immediately
+                raise
+    
+    return None
+
+
+def plan_batch_writes(updates):
+    """
+    Merge queued cell updates into as few A1 ranges as possible.
+    Later updates to the same cell win. Neighbouring cells in a row are joined
+    into one range, and identical column spans on consecutive rows are stacked
+    into a rectangle. Returns a list of {'range', 'values'} dicts for
+    worksheet.batch_update.
+    """
+    # Last write wins for each cell
+    cells = {}
+    for update in updates:
+        if update['type'] == 'cell':
+            cells[(update['row'], update['col'])] = update['value']
+    
+    # Join consecutive columns within each row into runs
+    runs = []  # (first_col, last_col, row, [values])
+    for row, col in sorted(cells, key=lambda cell: (cell[0], cell[1])):
+        value = cells[(row, col)]
+        if runs and runs[-1][2] == row and runs[-1][1] == col - 1:
+            first_col, _, _, values = runs[-1]
+            values.append(value)
+            runs[-1] = (first_col, col, row, values)
+        else:
+            runs.append((col, col, row, [value]))
+    
+    # Stack runs with the same column span on consecutive rows
+    blocks = []  # [first_row, last_row, first_col, last_col, [[values]]]
+    for first_col, last_col, row, values in sorted(runs, key=lambda run: (run[0], run[1], run[2])):
+        if blocks:
+            block = blocks[-1]
+            if block[2] == first_col and block[3] == last_col and block[1] == row - 1:
+                block[1] = row
+                block[4].append(values)
+                continue
+        blocks.append([row, row, first_col, last_col, [values]])
+    
+    data = []
+    for first_row, last_row, first_col, last_col, values in blocks:
+        cell_range = gspread.utils.rowcol_to_a1(first_row, first_col)
+        if (first_row, first_col) != (last_row, last_col):
+            cell_range += ':' + gspread.utils.rowcol_to_a1(last_row, last_col)
+        data.append({'range': cell_range, 'values': values})
+    return data
+
+
+def batch_update_sheets(worksheet, updates):
+    """
+    Perform batch updates to reduce API calls.
+    Queued cells are coalesced into ranges and written with values.batchUpdate,
+    one request per MAX_RANGES_PER_REQUEST ranges.
+    """
+    if not updates:
+        return True
+    
+    try:
+        data = plan_batch_writes(updates)
+        for start in range(0, len(data), MAX_RANGES_PER_REQUEST):
+            rate_limited_api_call(
+                worksheet.batch_update,
+                data[start:start + MAX_RANGES_PER_REQUEST],
+                value_input_option='USER_ENTERED'  # Same parsing as update_cell
+            )
+        
+        logger.info(f"Batch updated {len(updates)} cells in {len(data)} ranges")
+        return True
+    except Exception as e:
+        logger.error(f"Error in batch update: {e}")
+        return False
+
+
+def queue_update(row, col, value, update_type='cell'):
+    """
+    Queue an update for batch processing.
+    """
+    with pending_updates_lock:
+        pending_updates.append({
+            'type': update_type,
+            'row': row,
+            'col': col,
+            'value': value
+        })
+    
+    # Note: We'll process batches manually in flush_pending_updates
+    # to have better control over when updates are sent
+
+
+def flush_pending_updates(worksheet=None):
+    """
+    Write all pending updates in as few batchUpdate requests as possible.
+    """
+    global last_flush_time
+    
+    if not pending_updates or not worksheet:
+        return
+    
+    # Take everything queued so far in one go
+    with pending_updates_lock:
+        batch = list(pending_updates)
+        pending_updates.clear()
+        last_flush_time = time.time()
+    
+    if batch:
+        batch_update_sheets(worksheet, batch)
+
+
+def maybe_flush_pending_updates(worksheet=None):
+    """
+    Flush pending updates once BATCH_SIZE cells are queued or FLUSH_INTERVAL has passed.
+    """
+    if len(pending_updates) >= BATCH_SIZE or time.time() - last_flush_time >= FLUSH_INTERVAL:
+        flush_pending_updates(worksheet)
+
+
+def get_google_sheets_client(credentials_file):
+    """
+    Return the shared Google Sheets client for a credentials file.
+    Authorizes once per process over a pooled HTTP session, and refreshes the
+    access token centrally (under the session lock) when it has expired.
+    """
+    try:
+        with sheets_session_lock:
+            if credentials_file in sheets_clients:
+                credentials, client = sheets_clients[credentials_file]
+                if not credentials.valid:
+                    logger.info("Refreshing Google Sheets access token")
+                    credentials.refresh(Request())
+                return client
+            
+            credentials = Credentials.from_service_account_file(
+                credentials_file, scopes=SCOPES
+            )
+            session = AuthorizedSession(credentials)
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            client = gspread.authorize(credentials, session=session)
+            sheets_clients[credentials_file] = (credentials, client)
+            return client
+    except Exception as e:
+        logger.error(f"Failed to initialize Google Sheets client: {e}")
+        return None
+
+
+def get_worksheet(sheet_name, worksheet_name, credentials_file):
+    """
+    Return a cached worksheet handle, opening the spreadsheet only on first use.
+    """
+    key = (credentials_file, sheet_name, worksheet_name)
+    try:
+        with sheets_session_lock:
+            if key in worksheet_cache:
+                return worksheet_cache[key]
+            
+            client = get_google_sheets_client(credentials_file)
+            if not client:
+                return None
+            
+            sheet = spreadsheet_cache.get((credentials_file, sheet_name))
+            if sheet is None:
+                sheet = rate_limited_api_call(client.open, sheet_name)
+                spreadsheet_cache[(credentials_file, sheet_name)] = sheet
+            
+            worksheet = rate_limited_api_call(sheet.worksheet, worksheet_name)
+            worksheet_cache[key] = worksheet
+            return worksheet
+    except Exception as e:
+        logger.error(f"Failed to open worksheet '{worksheet_name}' in '{sheet_name}': {e}")
+        return None
+
+
+def parse_streak(value):
+    """
+    Parse a Zero Ads Streak cell value, treating blanks and junk as 0.
+    """
+    value = str(value).strip() if value is not None else ''
+    return int(value) if value.isdigit() else 0
+
+
+def next_zero_streak(streak, ad_count):
+    """
+    Return (new_streak, expired) for a row whose streak was `streak` when the
+    run started and that was just scraped with `ad_count` ads. The streak
+    grows on zero ads and resets otherwise; expired rows get deleted.
+    """
+    new_streak = streak + 1 if ad_count == 0 else 0
+    return new_streak, new_streak >= ZERO_STREAK_DELETE_AT
+
+
+def parse_timestamp(value):
+    """
+    Parse a Last Update Time cell value, or return None if it's blank or unrecognised.
+    The snapshot reads unformatted values, so timestamps Sheets parsed as dates
+    arrive as serial numbers (days since SHEETS_EPOCH) whatever the sheet's locale.
+    """
+    value = str(value).strip() if value is not None else ''
+    try:
+        return SHEETS_EPOCH + timedelta(days=float(value))
+    except (ValueError, OverflowError):
+        pass
+    for fmt in TIMESTAMP_READ_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def split_fresh_urls(urls, snapshot, ttl_hours):
+    """
+    Split (url, row) pairs into those due for a scrape and those whose
+    Last Update Time in the snapshot is within ttl_hours. Rows with a blank,
+    unparseable or future timestamp are always due. Returns (due, skipped).
+    """
+    if ttl_hours <= 0:
+        return list(urls), []
+    
+    now = datetime.now()
+    due, skipped = [], []
+    for url, row in urls:
+        updated = parse_timestamp(snapshot.get_timestamp(row))
+        if updated is not None and 0 <= (now - updated).total_seconds() < ttl_hours * 3600:
+            skipped.append((url, row))
+        else:
+            due.append((url, row))
+    return due, skipped
+
+
+class WorksheetSnapshot:
+    """
+    In-memory view of a worksheet, read once at the start of a run.
+
+    Holds header -> column and URL -> row maps plus the current Zero Ads Streak
+    and Last Update Time values, so per-URL updates never re-read the sheet.
+    The streaks read at load time are kept separately from the values staged
+    since, so a row staged more than once in the same run is only counted once.
+    Row numbers are 1-based sheet rows (row 1 is the header).
+    """
+
+    def __init__(self, values, url_header=URL_HEADER, ad_count_header=AD_COUNT_HEADER):
+        self.lock = threading.RLock()
+        self.url_header = url_header
+        self.ad_count_header = ad_count_header
+        headers = values[0] if values else []
+        self.header_cols = {}
+        for col, header in enumerate(headers, start=1):
+            if header and header not in self.header_cols:
+                self.header_cols[header] = col
+        self.num_cols = len(headers)
+
+        url_col = self.header_cols.get(url_header)
+        streak_col = self.header_cols.get(ZERO_STREAK_HEADER)
+        updated_col = self.header_cols.get(LAST_UPDATE_HEADER)
+
+        # Per-row state, index 0 is sheet row 2
+        self.urls = []
+        self.streaks = []
+        self.timestamps = []
+        for row_values in values[1:]:
+            self.urls.append(self._cell(row_values, url_col).strip())
+            self.streaks.append(parse_streak(self._cell(row_values, streak_col)))
+            self.timestamps.append(self._cell(row_values, updated_col))
+        self.loaded_streaks = list(self.streaks)
+
+        self.url_rows = {}
+        self._rebuild_url_index()
+        
+        # Rows whose streak reached ZERO_STREAK_DELETE_AT, deleted in one request at the end of the run
+        self.pending_deletions = set()
+
+    @staticmethod
+    def _cell(row_values, col):
+        if col is None or col > len(row_values):
+            return ''
+        value = row_values[col - 1]
+        return '' if value is None else str(value)
+
+    def _rebuild_url_index(self):
+        self.url_rows = {}
+        for i, url in enumerate(self.urls):
+            if url:
+                self.url_rows.setdefault(url, i + 2)  # First match wins
+
+    def col(self, header):
+        """Return the 1-based column for a header, or None if missing."""
+        return self.header_cols.get(header)
+
+    def url_at(self, row):
+        """Return the URL held in a sheet row, or '' if the row is out of range."""
+        with self.lock:
+            index = row - 2
+            return self.urls[index] if 0 <= index < len(self.urls) else ''
+
+    def row_for_url(self, url):
+        """Return the sheet row holding this exact URL, or None."""
+        with self.lock:
+            return self.url_rows.get(url.strip())
+
+    def resolve_row(self, url, row_number=None):
+        """
+        Return row_number if that row holds the URL, else the first row that
+        does, or None.
+        """
+        with self.lock:
+            if row_number is not None and self.url_at(row_number) == url.strip():
+                return row_number
+            return self.row_for_url(url)
+
+    def url_entries(self):
+        """Return (url, row) pairs for every row with a non-empty URL."""
+        with self.lock:
+            return [(url, i + 2) for i, url in enumerate(self.urls) if url]
+
+    def get_streak(self, row):
+        with self.lock:
+            return self.streaks[row - 2]
+
+    def get_loaded_streak(self, row):
+        """Return the streak the row had when the snapshot was read."""
+        with self.lock:
+            return self.loaded_streaks[row - 2]
+
+    def set_streak(self, row, value):
+        with self.lock:
+            self.streaks[row - 2] = value
+
+    def get_timestamp(self, row):
+        with self.lock:
+            return self.timestamps[row - 2]
+
+    def set_timestamp(self, row, value):
+        with self.lock:
+            self.timestamps[row - 2] = value
+
+    def ensure_column(self, worksheet, header):
+        """
+        Return the column for a header, appending it to the header row if missing.
+        """
+        with self.lock:
+            col = self.header_cols.get(header)
+            if col is None:
+                col = self.num_cols + 1
+                rate_limited_api_call(worksheet.update_cell, 1, col, header)
+                self.header_cols[header] = col
+                self.num_cols = col
+                logger.info(f"Created '{header}' column")
+            return col
+
+    def mark_for_deletion(self, row):
+        """
+        Queue a row for deletion at the end of the run. Rows keep their
+        numbers until apply_pending_deletions runs.
+        """
+        with self.lock:
+            self.pending_deletions.add(row)
+
+    def unmark_for_deletion(self, row):
+        with self.lock:
+            self.pending_deletions.discard(row)
+
+    def delete_rows(self, rows):
+        """
+        Drop rows from the snapshot and shift every row below them up,
+        mirroring the deleteDimension requests sent to the sheet.
+        """
+        with self.lock:
+            for row in sorted(set(rows), reverse=True):
+                index = row - 2
+                del self.urls[index]
+                del self.streaks[index]
+                del self.loaded_streaks[index]
+                del self.timestamps[index]
+            self.pending_deletions.difference_update(rows)
+            self._rebuild_url_index()
+
+
+def load_worksheet_snapshot(sheet_name, worksheet_name, credentials_file, url_header=URL_HEADER, ad_count_header=AD_COUNT_HEADER):
+    """
+    Read the whole worksheet in a single API call and build a WorksheetSnapshot.
+    """
+    try:
+        worksheet = get_worksheet(sheet_name, worksheet_name, credentials_file)
+        if not worksheet:
+            return None
+        
+        # Unformatted, so dates come back as serial numbers rather than locale text
+        with metrics.span('sheet_read'):
+            values = rate_limited_api_call(
+                worksheet.get_all_values,
+                value_render_option=gspread.utils.ValueRenderOption.unformatted,
+                date_time_render_option=gspread.utils.DateTimeOption.serial_number
+            )
+        snapshot = WorksheetSnapshot(values or [], url_header=url_header, ad_count_header=ad_count_header)
+        logger.info(f"Loaded worksheet snapshot: {len(snapshot.urls)} rows, {snapshot.num_cols} columns")
+        return snapshot
+        
+    except Exception as e:
+        logger.error(f"Error loading worksheet snapshot: {e}")
+        return None
+
+
+def get_urls_from_sheets(sheet_name, worksheet_name, credentials_file, snapshot=None):
+    """
+    Fetch URLs from Google Sheets from 'Page Transparency' column.
+    Reuses the run's worksheet snapshot when one is given.
+    """
+    try:
+        if snapshot is None:
+            snapshot = load_worksheet_snapshot(sheet_name, worksheet_name, credentials_file)
+            if snapshot is None:
+                return []
+        
+        if snapshot.col(snapshot.url_header) is None:
+            logger.error(f"'{snapshot.url_header}' column not found")
+            return []
+        
+        # Extract URLs from 'Page Transparency' column
+        urls = snapshot.url_entries()  # (url, row number) pairs
+        
+        logger.info(f"Retrieved {len(urls)} URLs from '{snapshot.url_header}' column")
+        return urls
+        
+    except Exception as e:
+        logger.error(f"Error fetching URLs from Google Sheets: {e}")
+        return []
+
+
+def apply_pending_deletions(worksheet, snapshot):
+    """
+    Delete every row queued during the run in a single spreadsheet batchUpdate.
+    The URL column is re-read first, since rows may have been inserted, removed
+    or sorted by hand since the snapshot was taken: each queued row is only
+    deleted where its URL now sits, and dropped if that can't be told for sure.
+    Adjacent rows are merged into one deleteDimension range and ranges are sent
+    in descending order, so earlier deletions never shift later ones.
+    Pending cell updates must be flushed before calling this.
+    """
+    with snapshot.lock:
+        queued = sorted(snapshot.pending_deletions)
+        if not queued:
+            return True
+        
+        url_col = snapshot.col(snapshot.url_header)
+        try:
+            current_urls = [value.strip() for value in rate_limited_api_call(worksheet.col_values, url_col)]
+        except Exception as e:
+            logger.error(f"Error re-reading URLs before deleting rows {queued}: {e}")
+            return False
+        if not current_urls or current_urls[0] != snapshot.url_header.strip():
+            logger.error(f"'{snapshot.url_header}' is no longer column {url_col}, not deleting rows {queued}")
+            return False
+        
+        current_rows = {}  # url -> sheet rows holding it now
+        for row, url in enumerate(current_urls[1:], start=2):
+            if url:
+                current_rows.setdefault(url, []).append(row)
+        
+        targets = {}  # snapshot row -> sheet row to delete
+        for row in queued:
+            url = snapshot.url_at(row)
+            if row <= len(current_urls) and current_urls[row - 1] == url:
+                targets[row] = row
+            elif url and len(current_rows.get(url, [])) == 1:
+                targets[row] = current_rows[url][0]
+                logger.warning(f"Row {row} for {url} has moved to row {targets[row]} since the run started")
+            else:
+                logger.warning(f"Row {row} no longer holds {url or 'its URL'}, not deleting it")
+        
+        dropped = [row for row in queued if row not in targets]
+        snapshot.pending_deletions.difference_update(dropped)
+        rows = sorted(set(targets.values()), reverse=True)
+        if not rows:
+            return True
+        
+        # Merge adjacent rows into (first_row, last_row) ranges, highest first
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1] = (row, ranges[-1][1])
+            else:
+                ranges.append((row, row))
+        
+        requests = [
+            {
+                'deleteDimension': {
+                    'range': {
+                        'sheetId': worksheet.id,
+                        'dimension': 'ROWS',
+                        'startIndex': first_row - 1,  # 0-based, inclusive
+                        'endIndex': last_row  # 0-based, exclusive
+                    }
+                }
+            }
+            for first_row, last_row in ranges
+        ]
+        
+        try:
+            rate_limited_api_call(worksheet.spreadsheet.batch_update, {'requests': requests})
+        except Exception as e:
+            logger.error(f"Error deleting rows {rows}: {e}")
+            return False
+        
+        snapshot.delete_rows(list(targets))
+        logger.info(f"Deleted {len(rows)} rows after {ZERO_STREAK_DELETE_AT} consecutive days of zero ads: {rows}")
+        return True
+
+
+def stage_ad_count_updates(worksheet, snapshot, url, ad_count, row_number=None, loaded_streak=None):
+    """
+    Resolve one scraped ad count against the worksheet snapshot and return the
+    cell updates it needs (ad count, Zero Ads Streak, Last Update Time).
+    row_number targets a specific row when the same URL appears more than once;
+    it is only trusted if that row still holds the URL.
+    The new streak is decided locally from the streak read with the snapshot,
+    or from loaded_streak when a replayed result carries the streak its own
+    run started from. A cell is only written when its staged value changes.
+    Rows whose streak reaches ZERO_STREAK_DELETE_AT are marked for deletion
+    instead of timestamped.
+    Returns (target_row, updates), or None if the URL or a required column is missing.
+    """
+    # Hold the snapshot lock so a row deletion cannot shift rows under us
+    with snapshot.lock:
+        if snapshot.col(snapshot.url_header) is None:
+            logger.error(f"'{snapshot.url_header}' column not found")
+            return None
+        
+        # Find the row that matches the exact URL
+        target_row = snapshot.resolve_row(url, row_number)
+        if target_row is None:
+            logger.warning(f"URL not found in Page Transparency column: {url}")
+            return None
+        
+        logger.info(f"Found matching URL at row {target_row}: {url}")
+        
+        # Resolve required columns from the snapshot
+        ad_count_col = snapshot.col(snapshot.ad_count_header)
+        if ad_count_col is None:
+            logger.warning(f"Required column not found: {snapshot.ad_count_header}")
+            return None
+        
+        # Zero Ads Streak column is created if it doesn't exist
+        zero_streak_col = snapshot.ensure_column(worksheet, ZERO_STREAK_HEADER)
+        
+        updated_col = snapshot.col(LAST_UPDATE_HEADER)
+        if updated_col is None:
+            logger.warning(f"'{LAST_UPDATE_HEADER}' column not found, skipping timestamp update")
+        
+        # Ad count update
+        updates = [{'type': 'cell', 'row': target_row, 'col': ad_count_col, 'value': ad_count}]
+        
+        # Handle Zero Ads Streak logic, counting from the streak the run started
+        # with so a row staged twice in this run (e.g. a duplicate URL whose
+        # own row is gone falling back to the first match) isn't counted twice.
+        # A replayed result counts from the streak journaled with it instead:
+        # this run's snapshot may already hold the interrupted run's write.
+        if loaded_streak is None:
+            loaded_streak = snapshot.get_loaded_streak(target_row)
+        new_streak, expired = next_zero_streak(loaded_streak, ad_count)
+        if new_streak != snapshot.get_streak(target_row):
+            updates.append({'type': 'cell', 'row': target_row, 'col': zero_streak_col, 'value': new_streak})
+            snapshot.set_streak(target_row, new_streak)
+            logger.info(f"Updated Zero Ads Streak to {new_streak} for row {target_row}")
+        
+        # Delete the row once the streak expires (deferred to the end of the run
+        # so row numbers stay valid for every other queued write)
+        if expired:
+            snapshot.mark_for_deletion(target_row)
+            logger.info(f"Queued row {target_row} for deletion after {ZERO_STREAK_DELETE_AT} consecutive days of zero ads")
+            return target_row, updates
+        snapshot.unmark_for_deletion(target_row)
+        
+        # Last Update Time timestamp update if column exists
+        if updated_col:
+            current_time = datetime.now().strftime(TIMESTAMP_FORMAT)
+            updates.append({'type': 'cell', 'row': target_row, 'col': updated_col, 'value': current_time})
+            snapshot.set_timestamp(target_row, current_time)
+            logger.info(f"Queued Last Update Time update to {current_time} for row {target_row}")
+        
+        return target_row, updates
+
+
+def update_sheets_with_ad_count(sheet_name, worksheet_name, credentials_file, url, ad_count, competitor_name, row_number, snapshot=None):
+    """
+    Update Google Sheets with ad count results and handle Zero Ads Streak.
+    Match by exact Page Transparency URL instead of row number, resolving
+    rows, columns and the current streak against the run's worksheet snapshot.
+    Used for standalone calls; process_urls_from_sheets goes through SheetWriter.
+    Without a snapshot, one is read for this call (a full-sheet read, so
+    loops should pass the run's snapshot) and the cells, plus the row deletion
+    if the streak expired, are written before returning. With the run's
+    snapshot, cells are queued and go out in bulk; the caller must
+    flush_pending_updates() and apply_pending_deletions() at the end of the run.
+    """
+    try:
+        own_snapshot = snapshot is None
+        if own_snapshot:
+            snapshot = load_worksheet_snapshot(sheet_name, worksheet_name, credentials_file)
+            if snapshot is None:
+                return False
+        
+        worksheet = get_worksheet(sheet_name, worksheet_name, credentials_file)
+        if not worksheet:
+            return False
+        
+        staged = stage_ad_count_updates(worksheet, snapshot, url, ad_count, row_number=row_number)
+        if staged is None:
+            return False
+        
+        target_row, updates = staged
+        if own_snapshot:
+            # Nobody else will flush or delete for a one-off call
+            if not batch_update_sheets(worksheet, updates):
+                return False
+            if snapshot.pending_deletions and not apply_pending_deletions(worksheet, snapshot):
+                return False
+        else:
+            for update in updates:
+                queue_update(update['row'], update['col'], update['value'])
+            
+            # Writes go out in bulk once enough have been queued
+            maybe_flush_pending_updates(worksheet)
+        
+        logger.info(f"Updated ad count for {competitor_name}: {ad_count} (Row {target_row}) - URL: {url}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error updating Google Sheets: {e}")
+        return False
+
+
+class RunJournal:
+    """
+    Append-only JSONL checkpoint of one scrape run.
+
+    Every scraped result is journaled before it is handed to the writer, and
+    every result the writer has committed to the sheet is journaled after the
+    write succeeds; entries are keyed by run ID, target, URL and row. If the
+    process dies, the next run picks up the unfinished run ID: committed rows
+    are not scraped again, and scraped-but-uncommitted results are replayed
+    into the writer without reopening their pages. complete() marks the run
+    finished and empties the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.scraped = {}  # target key -> {(url, row_number): (ad_count, competitor_name, loaded streak)}
+        self.committed = {}  # target key -> set of (url, row_number)
+        self.run_id = None
+        self._load()
+        self.resumed = self.run_id is not None
+        if not self.resumed:
+            self.run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.urandom(3).hex()}"
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if not self.resumed:
+            self._append({'event': 'run'})
+
+    def _load(self):
+        """Rebuild the state of the last unfinished run, if the journal holds one."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-write
+                event = entry.get('event')
+                if event == 'run':
+                    self.run_id = entry['run_id']
+                    self.scraped, self.committed = {}, {}
+                elif event == 'complete' and entry.get('run_id') == self.run_id:
+                    self.run_id = None
+                    self.scraped, self.committed = {}, {}
+                elif entry.get('run_id') != self.run_id:
+                    continue
+                elif event == 'scraped':
+                    self.scraped.setdefault(entry['target'], {})[(entry['url'], entry['row'])] = (
+                        entry['ad_count'], entry.get('competitor_name'), entry.get('streak'))
+                elif event == 'committed':
+                    self.committed.setdefault(entry['target'], set()).update(
+                        (url, row_number) for url, row_number in entry['rows'])
+
+    def _append(self, entry):
+        entry = dict(entry, run_id=self.run_id)
+        with self.lock:
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def committed_rows(self, target_key):
+        """(url, row_number) pairs already written to the sheet by the unfinished run."""
+        return self.committed.get(target_key, set())
+
+    def pending_results(self, target_key):
+        """
+        (url, ad_count, competitor_name, row_number, streak) scraped but never
+        written; streak is the row's Zero Ads Streak when the run started.
+        """
+        done = self.committed_rows(target_key)
+        return [
+            (url, ad_count, competitor_name, row_number, streak)
+            for (url, row_number), (ad_count, competitor_name, streak) in self.scraped.get(target_key, {}).items()
+            if (url, row_number) not in done
+        ]
+
+    def record_scraped(self, target_key, url, ad_count, competitor_name, row_number, streak=None):
+        self._append({'event': 'scraped', 'target': target_key, 'url': url, 'ad_count': ad_count,
+                      'competitor_name': competitor_name, 'row': row_number, 'streak': streak})
+
+    def record_committed(self, target_key, rows):
+        if rows:
+            self._append({'event': 'committed', 'target': target_key, 'rows': [list(entry) for entry in rows]})
+
+    def complete(self):
+        """Mark the run finished and empty the journal for the next one."""
+        self._append({'event': 'complete'})
+        with self.lock:
+            self.file.truncate(0)
+            self.file.close()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+def journal_key(target):
+    """Journal key for a sheet/worksheet target."""
+    return f"{target['sheet_name']}/{target['worksheet_name']}"
+
+
+class SheetWriter(threading.Thread):
+    """
+    Single writer stage between the scrape workers and the sheet.
+
+    Workers submit() results onto a bounded queue and go straight back to
+    scraping; submit() blocks when the queue is full, which throttles the
+    scrapers if the writer falls behind. The writer thread stages each result
+    against the snapshot, coalesces the cell updates and commits them in bulk
+    once BATCH_SIZE cells are pending or FLUSH_INTERVAL has passed. close()
+    drains the queue, does the final flush and applies deferred row deletions.
+    With a RunJournal, results are journaled on submit and again once their
+    cells (and any row deletion) have been committed.
+    """
+
+    _STOP = object()
+
+    def __init__(self, sheet_name, worksheet_name, credentials_file, snapshot, max_queue=WRITER_QUEUE_SIZE, journal=None):
+        super().__init__(name='sheet-writer', daemon=True)
+        self.sheet_name = sheet_name
+        self.worksheet_name = worksheet_name
+        self.credentials_file = credentials_file
+        self.snapshot = snapshot
+        self.results = queue.Queue(maxsize=max_queue)
+        self.pending = []  # staged cell updates, only touched by the writer thread
+        self.pending_urls = []  # (url, row_number) whose updates are in self.pending
+        self.deleting_urls = []  # (url, row_number) committed only once their row deletion goes through
+        self.journal = journal
+        self.journal_key = f"{sheet_name}/{worksheet_name}"
+        self.last_flush = time.time()
+        self.written = 0
+        self.failed = 0
+        self.write_errors = 0  # failed sheet writes; their results stay uncommitted in the journal
+
+    def submit(self, url, ad_count, competitor_name, row_number, streak=None, replay=False):
+        """
+        Queue a scraped result for writing, blocking while the writer is behind.
+        replay=True is for results read back from the journal, which are already
+        in it; streak is the Zero Ads Streak journaled with them.
+        New results are journaled with the row's streak from this run's snapshot.
+        """
+        if streak is None and not replay:
+            target_row = self.snapshot.resolve_row(url, row_number)
+            streak = self.snapshot.get_loaded_streak(target_row) if target_row else None
+        item = (url, ad_count, competitor_name, row_number, streak)
+        if self.journal and not replay:
+            self.journal.record_scraped(self.journal_key, *item)
+        try:
+            self.results.put_nowait(item)
+        except queue.Full:
+            logger.info("Sheet writer queue is full, waiting for it to catch up")
+            self.results.put(item)
+
+    def close(self):
+        """Stop accepting results, write everything still queued and wait for the thread."""
+        self.results.put(self._STOP)
+        self.join()
+
+    def run(self):
+        worksheet = get_worksheet(self.sheet_name, self.worksheet_name, self.credentials_file)
+        while True:
+            # Only wake up on a timer when there is something waiting to be flushed
+            timeout = max(0.0, self.last_flush + FLUSH_INTERVAL - time.time()) if self.pending else None
+            try:
+                item = self.results.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            
+            if item is self._STOP:
+                break
+            if item is not None:
+                self._stage(worksheet, item)
+            
+            if len(self.pending) >= BATCH_SIZE or (self.pending and time.time() - self.last_flush >= FLUSH_INTERVAL):
+                self._flush(worksheet)
+        
+        # Final flush of any remaining pending updates, then the deferred row deletions
+        self._flush(worksheet)
+        if worksheet and self.snapshot.pending_deletions:
+            if apply_pending_deletions(worksheet, self.snapshot):
+                self._commit(self.deleting_urls)
+            else:
+                self.write_errors += 1
+        elif not self.snapshot.pending_deletions:
+            self._commit(self.deleting_urls)
+        logger.info(f"Sheet writer finished: {self.written} results written, {self.failed} failed")
+
+    def _stage(self, worksheet, item):
+        url, ad_count, competitor_name, row_number, streak = item
+        try:
+            if not worksheet:
+                raise RuntimeError("worksheet is not available")
+            staged = stage_ad_count_updates(worksheet, self.snapshot, url, ad_count, row_number=row_number, loaded_streak=streak)
+            if staged is None:
+                self.failed += 1
+                # Nothing can be written for this URL, so don't replay it
+                self._commit([(url, row_number)])
+                return
+            target_row, updates = staged
+            self.pending.extend(updates)
+            if target_row in self.snapshot.pending_deletions:
+                self.deleting_urls.append((url, row_number))
+            else:
+                self.pending_urls.append((url, row_number))
+            self.written += 1
+            logger.info(f"Staged ad count for {competitor_name}: {ad_count} (Row {target_row}) - URL: {url}")
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error staging sheet update for {url}: {e}")
+
+    def _flush(self, worksheet):
+        self.last_flush = time.time()
+        if not self.pending or not worksheet:
+            return
+        batch, self.pending = self.pending, []
+        urls, self.pending_urls = self.pending_urls, []
+        if batch_update_sheets(worksheet, batch):
+            self._commit(urls)
+        else:
+            self.write_errors += 1
+
+    def _commit(self, rows):
+        if self.journal and rows:
+            try:
+                self.journal.record_committed(self.journal_key, rows)
+            except Exception as e:
+                logger.error(f"Error journaling committed results: {e}")
+
+
+def extract_page_id(url):
+    """Extract page ID from Facebook Ads Library URL."""
+    parsed_url = urlparse(url)
+    query_params = parse_qs(parsed_url.query)
+    return query_params.get("view_all_page_id", [None])[0]
+
+
+def canonicalize_ads_url(url):
+    """
+    Normalise an Ads Library URL so variants of the same listing compare equal.
+    Returns https://www.facebook.com/ads/library/ with the listing's filter
+    params sorted and sort/tracking params dropped, or None if the URL isn't
+    an Ads Library page URL with a numeric view_all_page_id.
+    """
+    try:
+        parsed_url = urlparse(url.strip())
+    except (AttributeError, ValueError):
+        return None
+    if parsed_url.scheme not in ('http', 'https') or (parsed_url.hostname or '') not in ADS_LIBRARY_HOSTS:
+        return None
+    if not parsed_url.path.rstrip('/').endswith('/ads/library'):
+        return None
+    
+    params = {}
+    for key, value in parse_qsl(parsed_url.query):
+        if key in IGNORED_URL_PARAMS or key.startswith('utm_'):
+            continue
+        params.setdefault(key, value)
+    if not params.get('view_all_page_id', '').isdigit():
+        return None
+    return 'https://www.facebook.com/ads/library/?' + urlencode(sorted(params.items()))
+
+
+class ResultRouter:
+    """
+    Fans each scraped page out to every sheet row that lists it.
+
+    Scrape tasks run on canonical URLs and submit() their result here as if it
+    were a SheetWriter; the router forwards it to each member row's writer
+    with that row's original URL and row number.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages  # canonical url -> [(writer, url, row_number)]
+
+    def submit(self, url, ad_count, competitor_name, row_number=None):
+        for writer, member_url, member_row in self.pages.get(url, []):
+            writer.submit(member_url, ad_count, competitor_name, member_row)
+
+
+def parse_shard(value):
+    """Parse an 'i/N' shard spec (0 <= i < N) into (index, count)."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in 0..{count - 1}, got {value!r}")
+    return index, count
+
+
+def shard_for_url(canonical_url, count):
+    """
+    Stable shard for a canonical Ads Library URL, hashed on its page ID so
+    every row (and every sheet) listing a page lands on the same shard.
+    """
+    page_id = extract_page_id(canonical_url) or canonical_url
+    return zlib.crc32(page_id.encode('utf-8')) % count
+
+
+class ShardResultSink:
+    """
+    Stands in for a SheetWriter on a sharded run.
+
+    Shards never touch the sheet: results are appended to the shard's JSONL
+    results file, and merge_shard_results applies every shard's file once,
+    so writes and row deletions can't race between runners.
+    """
+
+    def __init__(self, results_file, sheet_name, worksheet_name, lock=None):
+        self.results_file = results_file
+        self.target_key = f"{sheet_name}/{worksheet_name}"
+        self.lock = lock or threading.Lock()  # share one lock between sinks on the same file
+        self.written = 0
+        self.write_errors = 0  # results that couldn't be appended; the merge won't see them
+
+    def start(self):
+        pass
+
+    def submit(self, url, ad_count, competitor_name, row_number, streak=None, replay=False):
+        entry = {'target': self.target_key, 'url': url, 'row': row_number,
+                 'ad_count': ad_count, 'competitor_name': competitor_name}
+        with self.lock:
+            try:
+                with open(self.results_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + '\n')
+                self.written += 1
+            except OSError as e:
+                self.write_errors += 1
+                logger.error(f"Error saving shard result for {url} to {self.results_file}: {e}")
+
+    def close(self):
+        logger.info(f"Shard results for '{self.target_key}': {self.written} results saved to {self.results_file}"
+                    f"{f', {self.write_errors} failed' if self.write_errors else ''}")
+
+
+class ProfileManager:
+    """
+    Hands out a bounded set of Chrome user-data dirs under one run directory.
+
+    A profile is used by one driver at a time. When the driver is done the
+    profile is deleted, or, with reuse enabled, kept warm (HTTP cache and
+    accepted consent cookies) for the next driver. close() removes everything.
+    """
+
+    def __init__(self, max_profiles, reuse=REUSE_WARM_PROFILES, root=PROFILE_ROOT):
+        self.max_profiles = max_profiles
+        self.reuse = reuse
+        self.base_dir = tempfile.mkdtemp(prefix='ads-profiles-', dir=root)
+        self.condition = threading.Condition()
+        self.warm = deque()
+        self.count = 0  # profile dirs on disk, warm or in use
+        self.closed = False
+
+    def acquire(self):
+        """Return a warm profile if reuse is on and one is free, else a fresh dir."""
+        with self.condition:
+            while True:
+                if self.warm:
+                    return self.warm.popleft()
+                if self.count < self.max_profiles:
+                    self.count += 1
+                    return tempfile.mkdtemp(prefix='profile-', dir=self.base_dir)
+                self.condition.wait()
+
+    def release(self, profile_dir, reusable=True):
+        """
+        Give a profile back once its driver has quit. Profiles from crashed or
+        recycled-for-cause drivers should pass reusable=False to be deleted.
+        """
+        with self.condition:
+            if self.reuse and reusable and not self.closed:
+                self.warm.append(profile_dir)
+                self.condition.notify()
+                return
+            self.count -= 1
+            self.condition.notify()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+    def close(self):
+        """Delete every profile dir created by this manager."""
+        with self.condition:
+            self.closed = True
+            self.warm.clear()
+            self.count = 0
+            self.condition.notify_all()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+
+def apply_resource_blocking(driver):
+    """
+    Block heavy resources for the driver's current tab via CDP.
+    Blocking is per tab, so call this again after opening a new one.
+    """
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+
+
+def create_chrome_driver(driver_path, profile_dir, block_resources=BLOCK_HEAVY_RESOURCES):
+    """
+    Launch a headless Chrome instance with the scraper's standard options.
+    With block_resources, images, media, fonts and trackers are never downloaded.
+    """
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--log-level=3")
+    # Return from driver.get at DOMContentLoaded; wait_for_page_state waits for the content we need
+    options.page_load_strategy = 'eager'
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    options.add_argument(f'--user-data-dir={profile_dir}')
+    options.add_argument(f'--disk-cache-size={PROFILE_CACHE_MB * 1024 * 1024}')
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    # Keep background tabs loading at full speed in multi-tab mode
+    options.add_argument("--disable-background-timer-throttling")
+    options.add_argument("--disable-backgrounding-occluded-windows")
+    options.add_argument("--disable-renderer-backgrounding")
+
+    if block_resources:
+        # Belt and braces: images stay off even in tabs opened before CDP blocking applies
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    service = Service(executable_path=driver_path)
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.set_page_load_timeout(60)
+    if block_resources:
+        try:
+            apply_resource_blocking(driver)
+        except Exception as e:
+            logger.warning(f"Could not enable resource blocking: {e}")
+    return driver
+
+
+def kill_process_tree(pid):
+    """Kill a process and everything it spawned. Returns the number of processes killed."""
+    try:
+        root = psutil.Process(pid)
+        procs = root.children(recursive=True) + [root]
+    except psutil.Error:
+        return 0
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.Error:
+            continue
+    _, alive = psutil.wait_procs(procs, timeout=5)
+    for proc in alive:
+        logger.warning(f"Process {proc.pid} survived kill")
+    return len(procs) - len(alive)
+
+
+def kill_driver(driver):
+    """Kill chromedriver and every Chrome process under it."""
+    try:
+        return kill_process_tree(driver.service.process.pid)
+    except Exception as e:
+        logger.warning(f"Could not kill driver process tree: {e}")
+        return 0
+
+
+def quit_driver(driver):
+    """Quit a driver, logging instead of raising on failure. Falls back to killing its processes."""
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"Error closing driver: {e}")
+        # Don't leave orphaned Chrome processes behind
+        killed = kill_driver(driver)
+        if killed:
+            logger.warning(f"Killed {killed} leftover Chrome/chromedriver processes")
+
+
+class Deadline:
+    """A wall-clock budget for one scrape on one driver, tracked by DeadlineWatchdog."""
+
+    def __init__(self, driver, seconds, label):
+        self.driver = driver
+        self.expires_at = time.time() + seconds
+        self.seconds = seconds
+        self.label = label
+        self.expired = False
+
+
+class DeadlineWatchdog(threading.Thread):
+    """
+    Kills the Chrome/chromedriver process tree of any scrape that overruns
+    its Deadline. The worker's pending WebDriver call then fails at once,
+    its driver fails the pool's health check and is replaced, and the
+    worker sees deadline.expired and reports the URL as timed out.
+    """
+
+    def __init__(self):
+        super().__init__(name='deadline-watchdog', daemon=True)
+        self.condition = threading.Condition()
+        self.deadlines = set()
+        self.stopped = False
+
+    def watch(self, driver, seconds, label):
+        deadline = Deadline(driver, seconds, label)
+        with self.condition:
+            self.deadlines.add(deadline)
+            self.condition.notify()
+        return deadline
+
+    def cancel(self, deadline):
+        with self.condition:
+            self.deadlines.discard(deadline)
+
+    def close(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                if self.stopped:
+                    return
+                now = time.time()
+                due = [deadline for deadline in self.deadlines if deadline.expires_at <= now]
+                for deadline in due:
+                    self.deadlines.discard(deadline)
+                    deadline.expired = True
+                if not due:
+                    next_expiry = min((deadline.expires_at for deadline in self.deadlines), default=None)
+                    self.condition.wait(None if next_expiry is None else max(0.0, next_expiry - now))
+                    continue
+            
+            # Kill outside the lock; waiting on the processes can take a few seconds
+            for deadline in due:
+                killed = kill_driver(deadline.driver)
+                logger.error(f"Deadline of {deadline.seconds:.0f}s passed for {deadline.label}; "
+                             f"killed {killed} Chrome/chromedriver processes")
+
+
+def get_driver_memory_mb(driver):
+    """
+    Return the combined RSS in MB of chromedriver and every Chrome process it spawned.
+    """
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        total = 0
+        for proc in [process] + process.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+class DriverPool:
+    """
+    Pool of long-lived Chrome drivers shared by the scrape workers.
+
+    Workers check a driver out with acquire() and hand it back with release().
+    Returned drivers have their cookies and site storage cleared (unless the
+    profile manager keeps warm profiles). Drivers that fail a health check,
+    have served max_pages pages or use more than max_memory_mb are quit and
+    replaced lazily on a later acquire(). Each driver runs on a profile dir
+    checked out from the ProfileManager and returned when it quits.
+    Scrapes can put a driver under a wall-clock deadline with watch(); URLs
+    whose driver had to be killed are collected in timed_out for a retry pass.
+    """
+
+    def __init__(self, driver_path, size, max_pages=PAGES_PER_DRIVER, max_memory_mb=DRIVER_MEMORY_LIMIT_MB, profile_manager=None, block_resources=BLOCK_HEAVY_RESOURCES):
+        self.driver_path = driver_path
+        self.size = size
+        self.block_resources = block_resources
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.owns_profiles = profile_manager is None
+        self.profile_manager = profile_manager or ProfileManager(max_profiles=size)
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.page_counts = {}  # id(driver) -> pages served
+        self.profiles = {}  # id(driver) -> profile dir
+        self.live = 0  # idle + checked-out drivers
+        self.closed = False
+        self.autoscaler = None  # receives per-page outcomes when set
+        self.watchdog = None  # started on first watch()
+        self.timed_out = []  # URLs whose scrape was killed at its deadline
+
+    def acquire(self):
+        """
+        Check out an idle driver, launching a new one if the pool has room,
+        otherwise block until another worker releases one.
+        """
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self.idle:
+                    return self.idle.popleft()
+                if self.live < self.size:
+                    self.live += 1
+                    break
+                self.condition.wait()
+        
+        # Launch outside the lock so other workers aren't held up by Chrome startup
+        profile_dir = self.profile_manager.acquire()
+        try:
+            with metrics.span('driver_launch'):
+                driver = create_chrome_driver(self.driver_path, profile_dir, block_resources=self.block_resources)
+        except Exception:
+            self.profile_manager.release(profile_dir, reusable=False)
+            with self.condition:
+                self.live -= 1
+                self.condition.notify()
+            raise
+        
+        with self.condition:
+            self.page_counts[id(driver)] = 0
+            self.profiles[id(driver)] = profile_dir
+        logger.info(f"Launched pooled Chrome driver ({self.live}/{self.size} live)")
+        return driver
+
+    def release(self, driver, pages=1):
+        """
+        Return a driver after it has served the given number of pages. Resets
+        page-level state, or recycles the driver if it is unhealthy, worn out
+        or over the memory limit.
+        """
+        with self.condition:
+            pages = self.page_counts.get(id(driver), 0) + pages
+            self.page_counts[id(driver)] = pages
+        
+        reason = None
+        healthy = self._is_healthy(driver)
+        if not healthy:
+            reason = "failed health check"
+        elif pages >= self.max_pages:
+            reason = f"served {pages} pages"
+        else:
+            memory_mb = get_driver_memory_mb(driver)
+            if memory_mb > self.max_memory_mb:
+                reason = f"using {memory_mb:.0f} MB"
+        
+        if healthy:
+            try:
+                self._reset(driver, keep_profile_state=self.profile_manager.reuse)
+            except Exception as e:
+                healthy = False
+                reason = f"state reset failed: {e}"
+        
+        if reason is not None:
+            logger.info(f"Recycling Chrome driver ({reason})")
+            # Only a cleanly working profile is worth keeping warm
+            self._discard(driver, reusable_profile=healthy)
+            return
+        
+        with self.condition:
+            if not self.closed:
+                self.idle.append(driver)
+                self.condition.notify()
+                return
+        self._discard(driver)
+
+    def watch(self, driver, seconds, label):
+        """Start a deadline for a scrape on this driver; pair with unwatch()."""
+        with self.condition:
+            if self.watchdog is None:
+                self.watchdog = DeadlineWatchdog()
+                self.watchdog.start()
+        return self.watchdog.watch(driver, seconds, label)
+
+    def unwatch(self, deadline):
+        """Stop a deadline. Returns True if it had already expired and the driver was killed."""
+        self.watchdog.cancel(deadline)
+        return deadline.expired
+
+    def record_timed_out(self, urls):
+        with self.condition:
+            self.timed_out.extend(urls)
+
+    def record_outcome(self, outcome, seconds, pages=1):
+        """Report how page loads went ('ok', 'timeout', 'blocked' or 'error') to the autoscaler."""
+        if self.autoscaler is not None:
+            self.autoscaler.record(outcome, seconds, pages=pages)
+
+    def trim(self, keep):
+        """Quit idle drivers until at most `keep` drivers are live."""
+        with self.condition:
+            drivers = []
+            while self.idle and self.live - len(drivers) > keep:
+                drivers.append(self.idle.pop())
+        for driver in drivers:
+            self._discard(driver)
+        if drivers:
+            logger.info(f"Quit {len(drivers)} idle Chrome driver(s) after scaling down")
 
+    def close(self):
+        """Quit every idle driver; drivers still checked out are quit on release."""
+        with self.condition:
+            self.closed = True
+            drivers = list(self.idle)
+            self.idle.clear()
+            self.condition.notify_all()
+        for driver in drivers:
+            self._discard(driver)
+        if self.watchdog is not None:
+            self.watchdog.close()
+        if self.owns_profiles:
+            self.profile_manager.close()
 
-def rate_limited_api_call(func, *args, **kwargs):
+    def _discard(self, driver, reusable_profile=True):
+        quit_driver(driver)
+        with self.condition:
+            self.page_counts.pop(id(driver), None)
+            profile_dir = self.profiles.pop(id(driver), None)
+            self.live -= 1
+            self.condition.notify()
+        if profile_dir:
+            self.profile_manager.release(profile_dir, reusable=reusable_profile)
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(driver, keep_profile_state=False):
+        """
+        Clear cookies and site storage left behind by the previous page.
+        Warm profiles keep them on purpose (accepted consent, cached assets).
+        """
+        if not keep_profile_state:
+            # The Ads Library origins are cleared by name: in multi-tab mode the
+            # current tab is the blank home tab, whose origin is 'null'
+            origins = {f"https://{host}" for host in ADS_LIBRARY_HOSTS}
+            origin = driver.execute_script("return window.location.origin")
+            if origin and origin != 'null':
+                origins.add(origin)
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            for origin in sorted(origins):
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        driver.get('about:blank')
+
+
+def get_chrome_memory_mb():
+    """Combined RSS in MB of every child process (chromedriver and Chrome) of this process."""
+    total = 0
+    for proc in psutil.Process().children(recursive=True):
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+
+class ConcurrencyAutoscaler(threading.Thread):
     """
-    Execute API call with rate limiting and retry logic for 429 errors.
+    Adjusts how many scrape tasks run at once.
+
+    Tasks hold a slot (acquire()/release()) while they run. Every
+    AUTOSCALE_INTERVAL seconds the thread samples CPU, memory, load average
+    and Chrome RSS with psutil, plus page latency and timeout/block rates
+    reported through record(). It backs off by one slot when any signal is
+    over its limit, adds one when all have headroom and every slot was busy,
+    and logs each decision with the numbers behind it.
     """
-    global last_api_call_time
-    
-    with api_call_lock:
-        # Ensure minimum delay between API calls
-        current_time = time.time()
-        time_since_last_call = current_time - last_api_call_time
-        if time_since_last_call < RATE_LIMIT_DELAY:
-            sleep_time = RATE_LIMIT_DELAY - time_since_last_call
-            time.sleep(sleep_time)
-        
-        # Retry logic for 429 errors
-        for attempt in range(MAX_RETRIES):
+
+    def __init__(self, initial, minimum, maximum, driver_pool=None, interval=AUTOSCALE_INTERVAL):
+        super().__init__(name='autoscaler', daemon=True)
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.driver_pool = driver_pool
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.active = 0
+        self.saturated = False  # every slot was busy at some point this window
+        self.window = []  # (outcome, seconds per page) since the last decision
+        self.best_latency = None
+        self.stopped = threading.Event()
+        psutil.cpu_percent(interval=None)  # prime the CPU counter
+
+    def acquire(self):
+        """Block until a slot is free under the current limit."""
+        with self.condition:
+            while self.active >= self.limit:
+                self.saturated = True
+                self.condition.wait()
+            self.active += 1
+            if self.active >= self.limit:
+                self.saturated = True
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+    def record(self, outcome, seconds, pages=1):
+        with self.condition:
+            self.window.extend([(outcome, seconds / max(pages, 1))] * pages)
+
+    def close(self):
+        self.stopped.set()
+        self.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
             try:
-                result = func(*args, **kwargs)
-                last_api_call_time = time.time()
-                return result
+                self.adjust()
             except Exception as e:
-                if "429" in str(e) or "RATE_LIMIT_EXCEEDED" in str(e):
-                    if attempt < MAX_RETRIES - 1:
-                        wait_time = (2 ** attempt) * RATE_LIMIT_DELAY  # Exponential backoff
-                        logger.warning(f"Rate limit hit, retrying in {wait_time} seconds (attempt {attempt + 1}/{MAX_RETRIES})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        logger.error(f"Max retries reached for rate limit error: {e}")
-                        raise
-                else:
-                    # Non-rate-limit error, raise immediately
-                    raise
+                logger.warning(f"Autoscaler check failed: {e}")
+
+    def sample(self):
+        """Collect this window's signals and start a new window."""
+        with self.condition:
+            window, self.window = self.window, []
+            saturated, self.saturated = self.saturated, self.active >= self.limit
         
-        return None
+        latencies = sorted(seconds for outcome, seconds in window if outcome == 'ok')
+        signals = {
+            'cpu': psutil.cpu_percent(interval=None),
+            'memory': psutil.virtual_memory().percent,
+            'load': os.getloadavg()[0] / (psutil.cpu_count() or 1) if hasattr(os, 'getloadavg') else 0.0,
+            'chrome_mb': get_chrome_memory_mb(),
+            'pages': len(window),
+            'timeout_rate': sum(1 for outcome, _ in window if outcome == 'timeout') / len(window) if window else 0.0,
+            'blocked_rate': sum(1 for outcome, _ in window if outcome == 'blocked') / len(window) if window else 0.0,
+            'latency': latencies[len(latencies) // 2] if latencies else None,
+            'saturated': saturated
+        }
+        return signals
 
+    def decide(self, signals):
+        """Return (change, reason) for one window of signals: -1, 0 or +1 slots."""
+        enough = signals['pages'] >= AUTOSCALE_MIN_SAMPLES
+        latency = signals['latency'] if enough else None
+        
+        pressure = []
+        if signals['cpu'] > CPU_HIGH_PERCENT:
+            pressure.append(f"CPU {signals['cpu']:.0f}%")
+        if signals['memory'] > MEMORY_HIGH_PERCENT:
+            pressure.append(f"memory {signals['memory']:.0f}%")
+        if signals['load'] > LOAD_PER_CPU_HIGH:
+            pressure.append(f"load {signals['load']:.2f}/core")
+        if signals['chrome_mb'] > CHROME_RSS_LIMIT_MB:
+            pressure.append(f"Chrome RSS {signals['chrome_mb']:.0f} MB")
+        if enough and signals['timeout_rate'] > FAILURE_RATE_HIGH:
+            pressure.append(f"timeouts {signals['timeout_rate']:.0%}")
+        if enough and signals['blocked_rate'] > FAILURE_RATE_HIGH:
+            pressure.append(f"blocked {signals['blocked_rate']:.0%}")
+        if latency is not None and self.best_latency and latency > self.best_latency * LATENCY_BACKOFF_FACTOR:
+            pressure.append(f"page time {latency:.1f}s vs best {self.best_latency:.1f}s")
+        if pressure:
+            return -1, ', '.join(pressure)
+        
+        headroom = (
+            signals['cpu'] < CPU_LOW_PERCENT
+            and signals['memory'] < MEMORY_LOW_PERCENT
+            and signals['chrome_mb'] < CHROME_RSS_LIMIT_MB * 0.8
+            and (latency is None or not self.best_latency or latency <= self.best_latency * LATENCY_SCALE_UP_FACTOR)
+        )
+        if not headroom:
+            return 0, "no headroom"
+        if not enough:
+            return 0, "too few pages this window"
+        if not signals['saturated']:
+            return 0, "slots not all busy"
+        if self.limit >= self.maximum:
+            return 0, "at maximum"
+        return 1, "headroom on every signal"
 
-def batch_update_sheets(worksheet, updates):
-    """
-    Perform batch updates to reduce API calls.
-    """
-    if not updates:
-        return True
-    
-    try:
-        # Process individual cell updates with rate limiting
-        for update in updates:
-            if update['type'] == 'cell':
-                rate_limited_api_call(
-                    worksheet.update_cell,
-                    update['row'],
-                    update['col'],
-                    update['value']
-                )
+    def adjust(self):
+        signals = self.sample()
+        change, reason = self.decide(signals)
+        if signals['latency'] is not None and signals['pages'] >= AUTOSCALE_MIN_SAMPLES:
+            self.best_latency = min(self.best_latency or signals['latency'], signals['latency'])
         
-        logger.info(f"Batch updated {len(updates)} cells")
-        return True
-    except Exception as e:
-        logger.error(f"Error in batch update: {e}")
-        return False
+        with self.condition:
+            old_limit = self.limit
+            self.limit = min(max(self.limit + change, self.minimum), self.maximum)
+            new_limit = self.limit
+            self.condition.notify_all()
+        
+        latency = f"{signals['latency']:.1f}s" if signals['latency'] is not None else '-'
+        action = 'scale up' if new_limit > old_limit else 'back off' if new_limit < old_limit else 'hold'
+        logger.info(f"Autoscaler: {action} {old_limit} -> {new_limit} ({reason}); "
+                    f"cpu={signals['cpu']:.0f}% mem={signals['memory']:.0f}% load={signals['load']:.2f}/core "
+                    f"chrome={signals['chrome_mb']:.0f}MB pages={signals['pages']} p50={latency} "
+                    f"timeouts={signals['timeout_rate']:.0%} blocked={signals['blocked_rate']:.0%}")
+        
+        if new_limit < old_limit and self.driver_pool is not None:
+            self.driver_pool.trim(new_limit)
 
 
-def queue_update(row, col, value, update_type='cell'):
-    """
-    Queue an update for batch processing.
-    """
-    pending_updates.append({
-        'type': update_type,
-        'row': row,
-        'col': col,
-        'value': value
-    })
-    
-    # Note: We'll process batches manually in flush_pending_updates
-    # to have better control over when updates are sent
+# Terminal page states, checked in one script call. The first that holds wins:
+# 'count' (results heading or "N results" text), 'no_ads', 'login' (login
+# wall) or 'error' (browser or Facebook error page); null while still loading.
+PAGE_STATE_SCRIPT = """
+    if (document.querySelector("div[role='heading'][aria-level='3'].x8t9es0")) {
+        return 'count';
+    }
+    const body = document.body ? document.body.innerText : '';
+    if (/\\d\\s+results?\\b/i.test(body)) {
+        return 'count';
+    }
+    if (body.includes('No ads')) {
+        return 'no_ads';
+    }
+    // A logged-out header bar can carry a login form above the Ads Library
+    // itself, so the form only means a wall when the search box is missing
+    if (window.location.pathname.startsWith('/login')
+            || (document.querySelector("#login_form, form[action*='/login'], input[name='pass']")
+                && !document.querySelector("input[type='search'], input[placeholder*='Search by keyword']"))) {
+        return 'login';
+    }
+    if ((document.body && document.body.classList.contains('neterror'))
+            || /This content isn't available|Sorry, something went wrong|This page isn't available/i.test(body)) {
+        return 'error';
+    }
+    return null;
+"""
 
+# XPaths of common popup close buttons, checked in a single script call
+CLOSE_BUTTON_XPATHS = [
+    "//button[@aria-label='Close']",
+    "//button[contains(@class, 'close')]",
+    "//div[@role='button' and contains(@aria-label, 'Close')]",
+    "//span[contains(@class, 'close')]",
+    "//i[contains(@class, 'close')]",
+    "//button[text()='×']",
+    "//button[text()='Close']",
+    "//div[contains(@class, 'modal')]//button",
+    "//div[contains(@class, 'popup')]//button",
+    "//div[contains(@class, 'overlay')]//button"
+]
 
-def flush_pending_updates(worksheet=None):
+# Clicks the first visible, enabled match of each close-button XPath and
+# reports what it clicked and whether a dialog is still open
+DISMISS_POPUPS_SCRIPT = """
+    const xpaths = arguments[0];
+    const clicked = [];
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    for (const xpath of xpaths) {
+        const matches = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        for (let i = 0; i < matches.snapshotLength; i++) {
+            const el = matches.snapshotItem(i);
+            if (isVisible(el) && !el.disabled) {
+                el.click();
+                clicked.push(xpath);
+                break;
+            }
+        }
+    }
+    return {clicked: clicked, dialogOpen: !!document.querySelector("[role='dialog']")};
+"""
+
+
+# Single-call extractor. Runs every strategy in-page, in the same order the
+# Python side used to (exact heading, any "N results" element, "No ads"
+# marker, first div mentioning results), and returns
+# {countText, count, competitorName, noAds, strategy, timings}, where timings
+# holds the milliseconds spent in each strategy that ran. An optional list of
+# strategy names as the first argument restricts which ones run.
+EXTRACTION_STRATEGIES = ['heading', 'results_text', 'no_ads', 'js_fallback']
+EXTRACT_PAGE_SCRIPT = """
+    const only = arguments.length > 0 ? arguments[0] : null;
+    const enabled = (name) => !only || only.includes(name);
+    const result = {countText: null, count: null, competitorName: null, noAds: false, strategy: null, timings: {}};
+    const xpathAll = (xpath) => {
+        const matches = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < matches.snapshotLength; i++) {
+            nodes.push(matches.snapshotItem(i));
+        }
+        return nodes;
+    };
+    const toCount = (digits) => parseInt(digits.replace(/,/g, ''), 10);
+
+    // Competitor name from the search box
+    const searchBox = document.querySelector('input[placeholder="Search by keyword or advertiser"][type="search"]')
+        || xpathAll('//input[@type="search" and contains(@placeholder, "Search")]')[0];
+    if (searchBox && searchBox.value) {
+        result.competitorName = searchBox.value;
+    }
+    result.noAds = xpathAll("//div[contains(text(), 'No ads')]").length > 0;
+
+    // Strategies run in order (same as EXTRACTION_STRATEGIES); the first match wins.
+    // Each returns {countText, count} or null.
+    const strategies = {
+        // 1. Exact results-count heading
+        heading: () => {
+            const heading = xpathAll("//div[@role='heading' and @aria-level='3' and contains(@class, 'x8t9es0')]")[0];
+            if (heading) {
+                const text = heading.innerText.trim();
+                const match = text.match(/[~]?(\\d{1,3}(?:,\\d{3})*|\\d+)/);
+                if (match) {
+                    return {countText: text, count: toCount(match[1])};
+                }
+            }
+            return null;
+        },
+        // 2. Any element whose text says "N results"
+        results_text: () => {
+            for (const el of xpathAll("//*[contains(text(), 'result')]")) {
+                const text = (el.innerText || el.textContent || '').trim();
+                const match = text.match(/[~]?(\\d{1,3}(?:,\\d{3})*|\\d+)\\s+results?/i);
+                if (match) {
+                    return {countText: text, count: toCount(match[1])};
+                }
+            }
+            return null;
+        },
+        // 3. "No ads" marker
+        no_ads: () => result.noAds ? {countText: 'No ads', count: 0} : null,
+        // 4. Last resort: first div mentioning results
+        js_fallback: () => {
+            for (const el of document.querySelectorAll('div')) {
+                const text = el.textContent.trim();
+                if (text.includes('result')) {
+                    const match = text.match(/~?(\\d+(?:,\\d+)?)/);
+                    if (match) {
+                        return {countText: text.slice(0, 200), count: toCount(match[1])};
+                    }
+                    break;
+                }
+            }
+            return null;
+        },
+    };
+
+    // Milliseconds spent in each strategy that ran
+    for (const name of Object.keys(strategies)) {
+        if (!enabled(name)) {
+            continue;
+        }
+        const started = performance.now();
+        const found = strategies[name]();
+        result.timings[name] = performance.now() - started;
+        if (found) {
+            return Object.assign(result, found, {strategy: name});
+        }
+    }
+    return result;
+"""
+
+
+def wait_for_page_state(driver, page_name, timeout=15):
     """
-    Process all pending updates in batches.
+    Wait until the page reaches any terminal state (see PAGE_STATE_SCRIPT) and
+    return it, so zero-ads, login-wall and error pages finish as soon as they
+    render. Returns None on timeout; extraction then runs its own fallbacks.
+    'login' only counts once two polls in a row agree, since a page part way
+    through rendering can show the login form before the Ads Library UI.
     """
-    global pending_updates
+    seen = []
     
-    if not pending_updates or not worksheet:
-        return
+    def terminal_state(d):
+        state = d.execute_script(PAGE_STATE_SCRIPT)
+        seen.append(state)
+        if state == 'login' and seen[-2:] != ['login', 'login']:
+            return None
+        return state
     
-    # Process updates in batches
-    while pending_updates:
-        batch = []
-        for _ in range(min(BATCH_SIZE, len(pending_updates))):
-            if pending_updates:
-                batch.append(pending_updates.popleft())
-        
-        if batch:
-            batch_update_sheets(worksheet, batch)
-            time.sleep(RATE_LIMIT_DELAY)  # Delay between batches
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.25).until(terminal_state)
+    except TimeoutException:
+        logger.warning(f"Page '{page_name}' reached no known state after {timeout} seconds")
+        return None
 
 
-def get_google_sheets_client(credentials_file):
+def dismiss_popups(driver, page_name):
     """
-    Initialize and return Google Sheets client.
+    Close popups that might interfere with ad count extraction.
+    All close-button selectors are checked in one script call; a native ESC
+    is only sent if a dialog is still open afterwards.
     """
     try:
-        credentials = Credentials.from_service_account_file(
-            credentials_file, scopes=SCOPES
-        )
-        client = gspread.authorize(credentials)
-        return client
+        outcome = driver.execute_script(DISMISS_POPUPS_SCRIPT, CLOSE_BUTTON_XPATHS) or {}
+        for selector in outcome.get('clicked', []):
+            logger.info(f"Found and clicked close button for '{page_name}': {selector}")
+        if outcome.get('dialogOpen'):
+            logger.info(f"Pressing ESC to close dialog for '{page_name}'")
+            driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
     except Exception as e:
-        logger.error(f"Failed to initialize Google Sheets client: {e}")
-        return None
+        logger.warning(f"Error handling popups: {e}")
 
 
-def get_urls_from_sheets(sheet_name, worksheet_name, credentials_file):
+def interpret_extraction(result, url):
     """
-    Fetch URLs from Google Sheets from 'Page Transparency' column.
+    Turn the in-page extractor's result into (ad_count, competitor_name, strategy).
+    ad_count is None when no strategy matched.
     """
+    result = result or {}
+    
+    competitor_name = (result.get('competitorName') or '').strip()
+    if not competitor_name:
+        current_page_id = extract_page_id(url)
+        competitor_name = f"Competitor_{current_page_id}" if current_page_id else "Unknown"
+    
+    ad_count = result.get('count')
     try:
-        client = get_google_sheets_client(credentials_file)
-        if not client:
-            return []
-        
-        sheet = client.open(sheet_name)
-        worksheet = sheet.worksheet(worksheet_name)
-        
-        # Get all records from the worksheet with rate limiting
-        records = rate_limited_api_call(worksheet.get_all_records)
-        
-        # Extract URLs from 'Page Transparency' column
-        urls = []
-        for i, record in enumerate(records, start=2):  # Start from row 2 (header is row 1)
-            url = record.get('Page Transperancy ')  # Note: keeping original spelling
-            if url and url.strip():
-                urls.append((url.strip(), i))  # Store URL with row number
-        
-        logger.info(f"Retrieved {len(urls)} URLs from 'Page Transperancy ' column")
-        return urls
-        
-    except Exception as e:
-        logger.error(f"Error fetching URLs from Google Sheets: {e}")
-        return []
+        ad_count = int(ad_count) if ad_count is not None else None
+    except (TypeError, ValueError):
+        ad_count = None
+    
+    return ad_count, competitor_name, result.get('strategy')
 
 
-def update_sheets_with_ad_count(sheet_name, worksheet_name, credentials_file, url, ad_count, competitor_name, row_number):
+def scrape_loaded_page(driver, url, page_record=None):
     """
-    Update Google Sheets with ad count results and handle Zero Ads Streak.
-    Match by exact Page Transparency URL instead of row number.
+    Extract the ad count and competitor name from an Ads Library page that is
+    already open in the driver's current window, dispatching on the page state.
+    Returns (ad_count, competitor_name, state); ad_count is None if it couldn't
+    be read and state is None if the page never reached a known state.
+    If given, page_record is filled with the state, strategy and timings.
     """
+    page_name = url[-30:]  # For logging
+    if page_record is None:
+        page_record = {}
+    timings = page_record.setdefault('timings', {})
+    
+    # Pages load with the 'eager' strategy; one wait ends on whichever state shows up first
+    with metrics.span('page_state', into=timings):
+        state = wait_for_page_state(driver, page_name)
+    page_record['state'] = state
+    
+    if state in ('login', 'error'):
+        logger.warning(f"{'Login wall' if state == 'login' else 'Error page'} shown for '{page_name}', skipping extraction")
+        return None, interpret_extraction(None, url)[1], state
+    if state != 'no_ads':
+        # Handle popups first; zero-ads pages have nothing to uncover
+        with metrics.span('popups', into=timings):
+            dismiss_popups(driver, page_name)
+    
+    # Count, competitor name and no-ads state in one round trip
     try:
-        client = get_google_sheets_client(credentials_file)
-        if not client:
-            return False
-        
-        sheet = client.open(sheet_name)
-        worksheet = sheet.worksheet(worksheet_name)
-        
-        try:
-            # Find the Page Transparency column first to match the exact URL
-            page_transparency_col = None
-            try:
-                page_transparency_col = rate_limited_api_call(worksheet.find, 'Page Transperancy ').col
-            except gspread.exceptions.CellNotFound:
-                logger.error("'Page Transperancy ' column not found")
-                return False
-            
-            # Find the row that matches the exact URL
-            all_records = rate_limited_api_call(worksheet.get_all_records)
-            target_row = None
-            
-            for i, record in enumerate(all_records, start=2):  # Start from row 2 (header is row 1)
-                sheet_url = record.get('Page Transperancy ', '').strip()
-                if sheet_url == url.strip():
-                    target_row = i
-                    break
-            
-            if target_row is None:
-                logger.warning(f"URL not found in Page Transparency column: {url}")
-                return False
-            
-            logger.info(f"Found matching URL at row {target_row}: {url}")
-            
-            # Find required columns with rate limiting
-            ad_count_col = rate_limited_api_call(worksheet.find, 'no.of ads By Ai').col
-            zero_streak_col = None
-            updated_col = None
-            
-            # Try to find Zero Ads Streak column, create if doesn't exist
-            try:
-                zero_streak_col = rate_limited_api_call(worksheet.find, 'Zero Ads Streak').col
-            except gspread.exceptions.CellNotFound:
-                # Add the column header if it doesn't exist
-                headers = rate_limited_api_call(worksheet.row_values, 1)
-                new_col = len(headers) + 1
-                rate_limited_api_call(worksheet.update_cell, 1, new_col, 'Zero Ads Streak')
-                zero_streak_col = new_col
-                logger.info("Created 'Zero Ads Streak' column")
-            
-            # Try to find Last Update Time column
-            try:
-                updated_col = rate_limited_api_call(worksheet.find, 'Last Update Time').col
-            except gspread.exceptions.CellNotFound:
-                logger.warning("'Last Update Time' column not found, skipping timestamp update")
-            
-            # Prepare batch updates
-            updates_to_queue = []
-            
-            # Queue ad count update
-            queue_update(target_row, ad_count_col, ad_count)
-            
-            # Handle Zero Ads Streak logic
-            current_streak = 0
-            try:
-                current_streak_value = rate_limited_api_call(worksheet.cell, target_row, zero_streak_col).value
-                current_streak = int(current_streak_value) if current_streak_value and current_streak_value.isdigit() else 0
-            except:
-                current_streak = 0
-            
-            if ad_count == 0:
-                # Increment streak
-                new_streak = current_streak + 1
-                queue_update(target_row, zero_streak_col, new_streak)
-                logger.info(f"Updated Zero Ads Streak to {new_streak} for row {target_row}")
-                
-                # Delete row if streak reaches 30
-                if new_streak >= 30:
-                    # Flush pending updates first
-                    flush_pending_updates(worksheet)
-                    rate_limited_api_call(worksheet.delete_rows, target_row)
-                    logger.info(f"Deleted row {target_row} after 30 consecutive days of zero ads")
-                    return True
-            else:
-                # Reset streak if ads > 0
-                if current_streak > 0:
-                    queue_update(target_row, zero_streak_col, 0)
-                    logger.info(f"Reset Zero Ads Streak for row {target_row}")
-            
-            # Queue Last Update Time timestamp update if column exists
-            if updated_col:
-                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                queue_update(target_row, updated_col, current_time)
-                logger.info(f"Queued Last Update Time update to {current_time} for row {target_row}")
-            
-            # Process any remaining updates in the queue
-            flush_pending_updates(worksheet)
-            
-            logger.info(f"Updated ad count for {competitor_name}: {ad_count} (Row {target_row}) - URL: {url}")
-            return True
-            
-        except gspread.exceptions.CellNotFound as e:
-            logger.warning(f"Required column not found: {e}")
-            return False
-        
+        with metrics.span('extract', into=timings):
+            result = driver.execute_script(EXTRACT_PAGE_SCRIPT)
+        for strategy_name, elapsed_ms in ((result or {}).get('timings') or {}).items():
+            metrics.record(f'strategy.{strategy_name}', elapsed_ms / 1000)
+            timings[f'strategy.{strategy_name}'] = round(elapsed_ms, 2)
     except Exception as e:
-        logger.error(f"Error updating Google Sheets: {e}")
-        return False
+        logger.warning(f"In-page extraction failed for '{page_name}': {str(e)}")
+        result = None
+    
+    ad_count, competitor_name, strategy = interpret_extraction(result, url)
+    page_record['strategy'] = strategy
+    page_record['count_text'] = (result or {}).get('countText')
+    logger.info(f"Competitor name: {competitor_name}")
+    
+    if ad_count is None:
+        logger.warning(f"Could not extract numeric ad count from page")
+    elif strategy == 'no_ads':
+        logger.info(f"Page '{page_name}' has no ads")
+    else:
+        logger.info(f"Extracted ad count for '{page_name}': {ad_count} ({strategy}: {result.get('countText')!r})")
+    
+    return ad_count, competitor_name, state
 
 
-def extract_page_id(url):
-    """Extract page ID from Facebook Ads Library URL."""
-    parsed_url = urlparse(url)
-    query_params = parse_qs(parsed_url.query)
-    return query_params.get("view_all_page_id", [None])[0]
+def page_outcome(ad_count, state):
+    """Classify a scraped page for the autoscaler: 'ok', 'blocked' or 'timeout'."""
+    if ad_count is not None:
+        return 'ok'
+    if state in ('login', 'error'):
+        return 'blocked'
+    return 'timeout' if state is None else 'error'
+
 
+def record_ad_count(url, row_number, ad_count, competitor_name, sheet_name, worksheet_name, credentials_file, snapshot=None, writer=None):
+    """Hand a scraped count to the writer stage, or update the sheet inline without one."""
+    if writer is not None:
+        writer.submit(url, ad_count, competitor_name, row_number)
+    else:
+        update_sheets_with_ad_count(sheet_name, worksheet_name, credentials_file, url, ad_count, competitor_name, row_number, snapshot=snapshot)
 
-def extract_ad_count_only(url_data, driver_path, sheet_name, worksheet_name, credentials_file):
+
+def extract_ad_count_only(url_data, driver_path, sheet_name, worksheet_name, credentials_file, snapshot=None, driver_pool=None, writer=None, results_stream=None):
     """
     Extract only the ad count from Facebook Ads Library page.
+    With a results_stream, the attempt is streamed out whether it worked or not.
+    Without a writer, a snapshot means the caller flushes queued updates at
+    the end of the run (see update_sheets_with_ad_count).
     """
     url, row_number = url_data  # Unpack URL and row number
     driver = None
+    deadline = None
+    own_pool = None
     page_name = url[-30:]  # For logging
+    page_record = {'timings': {}}
+    ad_count = competitor_name = error = None
     
     try:
         logger.info(f"Starting ad count extraction for: {page_name}")
         
         # --- Driver Setup ---
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--log-level=3")
-        options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        options.add_argument(f'--user-data-dir={tempfile.mkdtemp()}')
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-
-        service = Service(executable_path=driver_path)
-        driver = webdriver.Chrome(service=service, options=options)
-        wait = WebDriverWait(driver, 15)
-        
-        driver.set_page_load_timeout(60)
-        driver.get(url)
-        
-        # Extract page ID and competitor name
-        current_page_id = extract_page_id(url)
-        
-        # Get competitor name from search box
-        competitor_name = "Unknown"
-        search_box_selectors = [
-            (By.CSS_SELECTOR, 'input[placeholder="Search by keyword or advertiser"][type="search"]'),
-            (By.XPATH, '//input[@type="search" and contains(@placeholder, "Search")]')
-        ]
+        if driver_pool is None:
+            # Standalone call: a single-driver pool still cleans up its profile dir
+            own_pool = driver_pool = DriverPool(driver_path, size=1)
+        driver = driver_pool.acquire()
         
-        for by, value in search_box_selectors:
-            try:
-                element = driver.find_element(by, value)
-                competitor_name = element.get_attribute("value")
-                if competitor_name:
-                    break
-            except NoSuchElementException:
-                continue
-        
-        if competitor_name == "Unknown" and current_page_id:
-            competitor_name = f"Competitor_{current_page_id}"
+        # The watchdog kills this driver if the page overruns its budget
+        start = time.time()
+        deadline = driver_pool.watch(driver, PAGE_DEADLINE_SECONDS, page_name)
+        try:
+            with metrics.span('driver_get', into=page_record['timings']):
+                driver.get(url)
+            ad_count, competitor_name, state = scrape_loaded_page(driver, url, page_record=page_record)
+        finally:
+            killed = driver_pool.unwatch(deadline)
+        if killed and ad_count is None:
+            # Popup handling and extraction swallow their errors, so a page
+            # killed mid-scrape can come back without raising
+            raise TimeoutException(f"deadline of {PAGE_DEADLINE_SECONDS:.0f}s exceeded")
+        metrics.record('page_total', time.time() - start)
+        page_record['timings']['total'] = round((time.time() - start) * 1000, 2)
+        driver_pool.record_outcome(page_outcome(ad_count, state), time.time() - start)
+        if ad_count is not None:
+            # Update Google Sheets
+            record_ad_count(url, row_number, ad_count, competitor_name, sheet_name, worksheet_name, credentials_file, snapshot=snapshot, writer=writer)
+        return ad_count
+    
+    except Exception as e:
+        if deadline is not None and deadline.expired:
+            error = f"deadline of {PAGE_DEADLINE_SECONDS:.0f}s exceeded"
+            logger.error(f"Gave up on {page_name} after {PAGE_DEADLINE_SECONDS:.0f}s, queued for retry")
+            driver_pool.record_timed_out([url])
+            driver_pool.record_outcome('timeout', time.time() - start)
+        elif isinstance(e, TimeoutException):
+            error = f"page load timeout: {str(e).strip()}"
+            logger.error(f"Timed out loading {page_name}: {str(e)}")
+            driver_pool.record_timed_out([url])
+            driver_pool.record_outcome('timeout', time.time() - start)
+        else:
+            error = str(e).strip() or type(e).__name__
+            logger.error(f"Error extracting ad count from {page_name}: {str(e)}")
+            if driver:
+                driver_pool.record_outcome('error', 0.0)
+        return None
+    
+    finally:
+        if results_stream is not None:
+            if error is None and ad_count is None:
+                error = f"no ad count ({page_record.get('state') or 'no known page state'})"
+            results_stream.record(url, ad_count, competitor_name, page_record, error=error)
+        if driver:
+            driver_pool.release(driver)
+        if own_pool:
+            own_pool.close()
+
+
+def extract_ad_counts_multi_tab(url_batch, driver_path, sheet_name, worksheet_name, credentials_file, snapshot=None, driver_pool=None, writer=None, results_stream=None):
+    """
+    Extract ad counts for several URLs with one browser, one tab per URL.
+    Every tab starts loading before any is read, so the pages load concurrently
+    while earlier tabs are being extracted. Returns one result per URL, in order.
+    With a results_stream, every URL in the batch is streamed out.
+    """
+    results = [None] * len(url_batch)
+    page_records = [{'timings': {}} for _ in url_batch]
+    errors = [None] * len(url_batch)
+    competitor_names = [None] * len(url_batch)
+    driver = None
+    deadline = None
+    own_pool = None
+    
+    try:
+        logger.info(f"Starting multi-tab extraction for {len(url_batch)} URLs")
         
-        logger.info(f"Competitor name: {competitor_name}")
+        # --- Driver Setup ---
+        if driver_pool is None:
+            # Standalone call: a single-driver pool still cleans up its profile dir
+            own_pool = driver_pool = DriverPool(driver_path, size=1)
+        driver = driver_pool.acquire()
+        home_handle = driver.current_window_handle
+        start = time.time()
+        # One budget for the batch: each tab gets PAGE_DEADLINE_SECONDS
+        deadline = driver_pool.watch(driver, PAGE_DEADLINE_SECONDS * len(url_batch), f"a batch of {len(url_batch)} tabs")
         
-        # Handle popups and close buttons
-        def handle_popups_and_close_buttons():
-            """Handle popups and close buttons that might interfere with ad count extraction."""
+        # Kick off every navigation first; location changes from script don't block
+        tabs = []
+        for index, (url, row_number) in enumerate(url_batch):
             try:
-                # Press ESC to close any popups
-                logger.info(f"Pressing ESC to close potential popups for '{page_name}'")
-                driver.find_element(By.TAG_NAME, 'body').send_keys(Keys.ESCAPE)
-                time.sleep(2)
-                
-                # Look for common close button patterns and click them
-                close_button_selectors = [
-                    "//button[@aria-label='Close']",
-                    "//button[contains(@class, 'close')]",
-                    "//div[@role='button' and contains(@aria-label, 'Close')]",
-                    "//span[contains(@class, 'close')]",
-                    "//i[contains(@class, 'close')]",
-                    "//button[text()='×']",
-                    "//button[text()='Close']",
-                    "//div[contains(@class, 'modal')]//button",
-                    "//div[contains(@class, 'popup')]//button",
-                    "//div[contains(@class, 'overlay')]//button"
-                ]
-                
-                for selector in close_button_selectors:
-                    try:
-                        close_buttons = driver.find_elements(By.XPATH, selector)
-                        for button in close_buttons:
-                            if button.is_displayed() and button.is_enabled():
-                                logger.info(f"Found and clicking close button for '{page_name}': {selector}")
-                                button.click()
-                                time.sleep(1)
-                                break
-                    except Exception:
-                        continue
+                with metrics.span('tab_open', into=page_records[index]['timings']):
+                    driver.switch_to.new_window('tab')
+                    if driver_pool.block_resources:
+                        apply_resource_blocking(driver)
+                    driver.execute_script("window.location.href = arguments[0];", url)
+                tabs.append((driver.current_window_handle, index))
             except Exception as e:
-                logger.warning(f"Error handling popups: {e}")
-        
-        # Handle popups first
-        handle_popups_and_close_buttons()
+                errors[index] = f"could not open tab: {str(e).strip()}"
+                logger.error(f"Error opening tab for {url[-30:]}: {str(e)}")
+                # Close the half-opened tab so it doesn't linger in the pooled browser
+                try:
+                    if driver.current_window_handle != home_handle:
+                        driver.close()
+                    driver.switch_to.window(home_handle)
+                except Exception as close_error:
+                    logger.warning(f"Error closing failed tab for {url[-30:]}: {close_error}")
         
-        # Wait for either the ad count element or "No ads" message
-        try:
-            # Try to find the exact element structure from the examples
+        # Then read each tab in turn
+        for handle, index in tabs:
+            if deadline.expired:
+                break  # the browser is gone; the rest of the batch is retried
+            url, row_number = url_batch[index]
+            page_name = url[-30:]  # For logging
             try:
-                # First try the exact structure from examples
-                ad_count_element = wait.until(
-                    EC.presence_of_element_located((
-                        By.XPATH, 
-                        "//div[@role='heading' and @aria-level='3' and contains(@class, 'x8t9es0')]"
-                    ))
-                )
-                
-                ad_count_text = ad_count_element.text.strip()
-                logger.info(f"Found ad count text: {ad_count_text}")
-                
-                # Extract number using regex that handles all example cases
-                match = re.search(r'[~]?(\d{1,3}(?:,\d{3})*|\d+)', ad_count_text)
-                if match:
-                    ad_count = int(match.group(1).replace(',', ''))
-                    logger.info(f"Extracted ad count for '{page_name}': {ad_count}")
-                    
+                driver.switch_to.window(handle)
+                ad_count, competitor_name, state = scrape_loaded_page(driver, url, page_record=page_records[index])
+                competitor_names[index] = competitor_name
+                # Tabs load side by side, so each page is charged an equal share of the batch time
+                metrics.record('page_total', (time.time() - start) / len(url_batch))
+                page_records[index]['timings']['total'] = round((time.time() - start) * 1000, 2)
+                driver_pool.record_outcome(page_outcome(ad_count, state), (time.time() - start) / len(url_batch))
+                if ad_count is not None:
                     # Update Google Sheets
-                    update_sheets_with_ad_count(sheet_name, worksheet_name, credentials_file, url, ad_count, competitor_name, row_number)
-                    return ad_count
-                
-                # If no numbers found, check for "0 results" case
-                if '0 results' in ad_count_text:
-                    update_sheets_with_ad_count(sheet_name, worksheet_name, credentials_file, url, 0, competitor_name, row_number)
-                    return 0
-                    
-            except Exception as e:
-                logger.warning(f"Error with exact element match: {str(e)}")
-            
-            # Fallback to more general patterns if exact match fails
-            logger.info("Trying fallback patterns for ad count extraction")
-            
-            # Try to find any element containing 'results' text
-            try:
-                results_elements = wait.until(
-                    EC.presence_of_all_elements_located((
-                        By.XPATH, 
-                        "//*[contains(text(), 'result')]"
-                    ))
-                )
-                
-                for element in results_elements:
-                    try:
-                        text = element.text.strip()
-                        match = re.search(r'[~]?(\d{1,3}(?:,\d{3})*|\d+)\s+results?', text, re.IGNORECASE)
-                        if match:
-                            ad_count = int(match.group(1).replace(',', ''))
-                            logger.info(f"Fallback extracted ad count for '{page_name}': {ad_count}")
-                            
-                            # Update Google Sheets
-                            update_sheets_with_ad_count(sheet_name, worksheet_name, credentials_file, url, ad_count, competitor_name, row_number)
-                            return ad_count
-                    except:
-                        continue
-                        
+                    record_ad_count(url, row_number, ad_count, competitor_name, sheet_name, worksheet_name, credentials_file, snapshot=snapshot, writer=writer)
+                results[index] = ad_count
             except Exception as e:
-                logger.warning(f"Fallback pattern failed: {str(e)}")
-            
-            logger.warning(f"Could not extract numeric ad count from page")
-            return None
-                
-        except TimeoutException:
-            # Check if "No ads" message is present
-            try:
-                no_ads_element = driver.find_element(By.XPATH, "//div[contains(text(), 'No ads')]")
-                logger.info(f"Page '{page_name}' has no ads")
-                update_sheets_with_ad_count(sheet_name, worksheet_name, credentials_file, url, 0, competitor_name, row_number)
-                return 0
-            except NoSuchElementException:
-                # Try JavaScript as a last resort
+                errors[index] = str(e).strip() or type(e).__name__
+                logger.error(f"Error extracting ad count from {page_name}: {str(e)}")
+                driver_pool.record_outcome('error', 0.0)
+            finally:
                 try:
-                    ad_count_text = driver.execute_script("""
-                        const elements = document.querySelectorAll('div');
-                        for (const el of elements) {
-                            const text = el.textContent.trim();
-                            if (text.includes('results') || text.includes('result')) {
-                                return text;
-                            }
-                        }
-                        return null;
-                    """)
-                    
-                    if ad_count_text:
-                        matches = re.search(r'~?(\d+(?:,\d+)?)', ad_count_text)
-                        if matches:
-                            ad_count = int(matches.group(1).replace(',', ''))
-                            logger.info(f"JavaScript-extracted ad count for '{page_name}': {ad_count}")
-                            
-                            # Update Google Sheets
-                            update_sheets_with_ad_count(sheet_name, worksheet_name, credentials_file, url, ad_count, competitor_name, row_number)
-                            return ad_count
-                except Exception as js_error:
-                    logger.warning(f"JavaScript ad count extraction failed: {str(js_error)}")
-                
-                return None
+                    driver.close()
+                except Exception as e:
+                    logger.warning(f"Error closing tab for {page_name}: {e}")
+        
+        driver.switch_to.window(home_handle)
+        return results
     
     except Exception as e:
-        logger.error(f"Error extracting ad count from {page_name}: {str(e)}")
-        return None
+        logger.error(f"Error in multi-tab extraction: {str(e)}")
+        return results
     
     finally:
+        if deadline is not None and driver_pool.unwatch(deadline):
+            unfinished = [url for (url, _), result in zip(url_batch, results) if result is None]
+            logger.error(f"Multi-tab batch overran its deadline, {len(unfinished)} URLs queued for retry")
+            driver_pool.record_timed_out(unfinished)
+            for index, result in enumerate(results):
+                if result is None:
+                    errors[index] = f"deadline of {PAGE_DEADLINE_SECONDS * len(url_batch):.0f}s for the batch exceeded"
+        if results_stream is not None:
+            for index, (url, _) in enumerate(url_batch):
+                error = errors[index]
+                if error is None and results[index] is None:
+                    error = f"no ad count ({page_records[index].get('state') or 'no known page state'})"
+                results_stream.record(url, results[index], competitor_names[index], page_records[index], error=error)
         if driver:
-            try:
-                driver.quit()
-            except Exception as e:
-                logger.warning(f"Error closing driver: {e}")
+            driver_pool.release(driver, pages=len(url_batch))
+        if own_pool:
+            own_pool.close()
 
 
-def process_urls_from_sheets(sheet_name, worksheet_name, credentials_file, max_workers=2):
+def load_targets(targets_file, names=None):
     """
-    Process URLs from Google Sheets to extract ad counts.
+    Load sheet/worksheet targets from a JSON list. Each entry has name,
+    sheet_name, worksheet_name and optional url_header / ad_count_header.
+    With names, only those targets are returned ('all' keeps every target).
+    """
+    with open(targets_file) as f:
+        targets = json.load(f)
+    
+    if names and 'all' not in names:
+        known = {target['name'] for target in targets}
+        missing = [name for name in names if name not in known]
+        if missing:
+            raise ValueError(f"Unknown targets {missing} in {targets_file}")
+        targets = [target for target in targets if target['name'] in names]
+    return targets
+
+
+def interleave(groups):
+    """Round-robin items from several lists so no single list runs last."""
+    items = []
+    for i in range(max((len(group) for group in groups), default=0)):
+        items.extend(group[i] for group in groups if i < len(group))
+    return items
+
+
+def process_targets(targets, credentials_file, max_workers=2, tabs_per_browser=TABS_PER_BROWSER, freshness_ttl_hours=FRESHNESS_TTL_HOURS, journal_file=JOURNAL_FILE, shard=None, results_file=None, autoscale=AUTOSCALE, ads_data_file=ADS_DATA_FILE):
+    """
+    Process several sheet/worksheet targets in one run.
+    All targets share one driver pool, one Sheets client and one rate limiter,
+    so setup is paid once. Each target gets its own worksheet snapshot and
+    writer thread, and work from all targets is interleaved to keep the pool busy.
+    Rows whose Last Update Time is within freshness_ttl_hours are skipped.
+    With a journal_file, an interrupted run is resumed from its checkpoint.
+    Rows are grouped by canonical Ads Library URL across all targets, so each
+    page is loaded once and its count written to every row that lists it.
+    With shard=(index, count), only pages hashed to that shard are scraped and
+    results go to results_file for merge_shard_results instead of the sheet.
+    With autoscale, max_workers is the starting concurrency and the autoscaler
+    moves it between MIN_WORKERS and AUTOSCALE_MAX_WORKERS.
+    Every page attempt is streamed to ads_data_file as NDJSON.
+    Returns False if the run failed or any result couldn't be written out.
     """
+    journal = None
     try:
-        # Get URLs from Google Sheets
-        urls = get_urls_from_sheets(sheet_name, worksheet_name, credentials_file)
+        if shard is not None:
+            if journal_file:
+                logger.info("Checkpoint journal is off for sharded runs; the merge step applies results")
+            journal_file = None
+            # Start from an empty results file so a rerun never hands the merge stale results
+            open(results_file, 'w').close()
+            logger.info(f"Running shard {shard[0]}/{shard[1]}, saving results to {results_file}")
+        if journal_file:
+            journal = RunJournal(journal_file)
+            if journal.resumed:
+                logger.info(f"Resuming interrupted run {journal.run_id} from {journal_file}")
+            else:
+                logger.info(f"Starting run {journal.run_id}, journaling to {journal_file}")
         
-        if not urls:
-            logger.warning("No URLs found in Google Sheets")
-            return
+        # Read every worksheet once; every later lookup resolves against its snapshot
+        jobs = []
+        for target in targets:
+            sheet_name = target['sheet_name']
+            worksheet_name = target['worksheet_name']
+            snapshot = load_worksheet_snapshot(
+                sheet_name, worksheet_name, credentials_file,
+                url_header=target.get('url_header', URL_HEADER),
+                ad_count_header=target.get('ad_count_header', AD_COUNT_HEADER)
+            )
+            if snapshot is None:
+                logger.error(f"Could not load worksheet snapshot for '{sheet_name}' / '{worksheet_name}'")
+                continue
+            
+            # Get URLs from Google Sheets
+            urls = get_urls_from_sheets(sheet_name, worksheet_name, credentials_file, snapshot=snapshot)
+            if not urls:
+                logger.warning(f"No URLs found in '{sheet_name}' / '{worksheet_name}'")
+                continue
+            
+            # Leave rows refreshed within the TTL alone
+            urls, skipped = split_fresh_urls(urls, snapshot, freshness_ttl_hours)
+            if skipped:
+                logger.info(f"Skipping {len(skipped)} URLs in '{worksheet_name}' updated within the last {freshness_ttl_hours:g} hours")
+            
+            # Don't scrape again what the interrupted run already scraped
+            replay, resumed = [], 0
+            if journal and journal.resumed:
+                key = journal_key(target)
+                replay = journal.pending_results(key)
+                done = journal.committed_rows(key) | {(item[0], item[3]) for item in replay}
+                before = len(urls)
+                urls = [url_data for url_data in urls if url_data not in done]
+                resumed = before - len(urls)
+                if resumed:
+                    logger.info(f"'{worksheet_name}': {resumed} URLs already scraped by run {journal.run_id}, "
+                                f"{len(replay)} results to replay")
+            
+            # Reject anything that isn't an Ads Library page before a browser is involved
+            members, rejected = [], []
+            for url, row_number in urls:
+                canonical_url = canonicalize_ads_url(url)
+                if canonical_url is None:
+                    rejected.append((url, row_number))
+                    logger.warning(f"Skipping row {row_number} in '{worksheet_name}': not an Ads Library page URL: {url!r}")
+                else:
+                    members.append((canonical_url, url, row_number))
+            
+            # Keep only this shard's pages; every row of a page hashes alike
+            if shard is not None:
+                index, count = shard
+                before = len(members)
+                members = [member for member in members if shard_for_url(member[0], count) == index]
+                logger.info(f"'{worksheet_name}': {len(members)} of {before} URLs belong to shard {index}/{count}")
+            urls = [(url, row_number) for _, url, row_number in members]
+            
+            jobs.append({'target': target, 'snapshot': snapshot, 'urls': urls, 'members': members,
+                         'skipped': skipped, 'rejected': rejected, 'replay': replay, 'resumed': resumed})
         
-        logger.info(f"Processing {len(urls)} URLs from Google Sheets")
+        total_urls = sum(len(job['urls']) for job in jobs)
+        if not total_urls and not any(job['replay'] for job in jobs):
+            logger.warning("No URLs due for processing in Google Sheets")
+            if journal:
+                journal.complete()
+            return True
+        
+        # One scrape per unique page; the first target listing it schedules it
+        page_owners = {}
+        for job in jobs:
+            for canonical_url, _, _ in job['members']:
+                page_owners.setdefault(canonical_url, job)
+        logger.info(f"Processing {total_urls} URLs from {len(jobs)} target(s) as {len(page_owners)} unique pages "
+                    f"({total_urls - len(page_owners)} duplicates folded)")
         
         # Pre-install WebDriver
         try:
@@ -536,61 +2523,326 @@ def process_urls_from_sheets(sheet_name, worksheet_name, credentials_file, max_w
             logger.info(f"WebDriver installed at: {driver_executable_path}")
         except Exception as e:
             logger.error(f"Failed to install Chrome Driver: {e}")
-            return
+            return False
         
-        # Process URLs in parallel
+        # Process URLs in parallel, reusing one long-lived driver per worker.
+        # Scrapers hand results to one writer thread per target instead of writing inline.
         start_time = time.time()
+        pool_size = max(max_workers, AUTOSCALE_MAX_WORKERS) if autoscale else max_workers
+        profile_manager = ProfileManager(max_profiles=pool_size)
+        driver_pool = DriverPool(driver_executable_path, size=pool_size, profile_manager=profile_manager)
+        autoscaler = None
+        if autoscale:
+            autoscaler = ConcurrencyAutoscaler(max_workers, MIN_WORKERS, pool_size, driver_pool=driver_pool)
+            driver_pool.autoscaler = autoscaler
+            autoscaler.start()
+            logger.info(f"Autoscaling scrape workers between {autoscaler.minimum} and {autoscaler.maximum}, starting at {autoscaler.limit}")
+        results_lock = threading.Lock()  # every target's shard sink appends to the same file
+        for job in jobs:
+            if shard is not None:
+                job['writer'] = ShardResultSink(results_file, job['target']['sheet_name'], job['target']['worksheet_name'], lock=results_lock)
+            else:
+                job['writer'] = SheetWriter(job['target']['sheet_name'], job['target']['worksheet_name'], credentials_file, job['snapshot'], journal=journal)
+            job['writer'].start()
+            # Results scraped before the interruption go straight to the writer
+            for item in job['replay']:
+                job['writer'].submit(*item, replay=True)
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Create partial function with all required parameters
-            extract_task = partial(
-                extract_ad_count_only, 
-                driver_path=driver_executable_path,
-                sheet_name=sheet_name,
-                worksheet_name=worksheet_name,
-                credentials_file=credentials_file
-            )
+        # Scrapers submit per canonical URL; the router fans results out to each row's writer
+        pages = {}
+        page_rows = {}  # canonical url -> sheet rows, for the results stream
+        for job in jobs:
+            target_name = job['target'].get('name', job['target']['sheet_name'])
+            for canonical_url, url, row_number in job['members']:
+                pages.setdefault(canonical_url, []).append((job['writer'], url, row_number))
+                page_rows.setdefault(canonical_url, []).append({'target': target_name, 'row': row_number})
+        router = ResultRouter(pages)
+        page_results = {}
+        results_stream = None
+        if ads_data_file:
+            # A resumed run adds to the stream it was writing before
+            results_stream = ResultsStream(ads_data_file, page_rows=page_rows, append=bool(journal and journal.resumed))
+        
+        try:
+            # One task per unique page, or per batch of tabs in multi-tab mode
+            task_groups = []
+            for job in jobs:
+                target = job['target']
+                task_args = dict(
+                    driver_path=driver_executable_path,
+                    sheet_name=target['sheet_name'],
+                    worksheet_name=target['worksheet_name'],
+                    credentials_file=credentials_file,
+                    snapshot=job['snapshot'],
+                    driver_pool=driver_pool,
+                    writer=router,
+                    results_stream=results_stream
+                )
+                page_urls = [(canonical_url, None) for canonical_url, owner in page_owners.items() if owner is job]
+                if tabs_per_browser > 1:
+                    # Multi-tab mode: each worker drives a batch of tabs in one browser
+                    batches = [page_urls[i:i + tabs_per_browser] for i in range(0, len(page_urls), tabs_per_browser)]
+                    tasks = [(batch, partial(extract_ad_counts_multi_tab, batch, **task_args)) for batch in batches]
+                else:
+                    tasks = [([url_data], partial(extract_ad_count_only, url_data, **task_args)) for url_data in page_urls]
+                task_groups.append(tasks)
+            
+            def run_task(page_task):
+                batch, task = page_task
+                if autoscaler is not None:
+                    autoscaler.acquire()
+                try:
+                    result = task()
+                finally:
+                    if autoscaler is not None:
+                        autoscaler.release()
+                for (canonical_url, _), page_result in zip(batch, result if isinstance(result, list) else [result]):
+                    page_results[canonical_url] = page_result
+                return result
             
-            # Map URLs to extraction tasks
-            results = list(executor.map(extract_task, urls))
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                list(executor.map(run_task, interleave(task_groups)))
+                
+                # Pages killed at their deadline get another go, one page per task
+                for retry_pass in range(1, DEADLINE_RETRY_PASSES + 1):
+                    with driver_pool.condition:
+                        retry_urls = [url for url in dict.fromkeys(driver_pool.timed_out) if page_results.get(url) is None]
+                        driver_pool.timed_out = []
+                    if not retry_urls:
+                        break
+                    logger.info(f"Retry pass {retry_pass}: {len(retry_urls)} pages that hit the {PAGE_DEADLINE_SECONDS:.0f}s deadline")
+                    # Results go through the router, so the sheet details in task_args don't matter here
+                    retry_tasks = [([(url, None)], partial(extract_ad_count_only, (url, None), **task_args)) for url in retry_urls]
+                    list(executor.map(run_task, retry_tasks))
+                if driver_pool.timed_out:
+                    logger.warning(f"{len(set(driver_pool.timed_out))} pages still timed out after {DEADLINE_RETRY_PASSES} retry pass(es)")
+        finally:
+            if autoscaler is not None:
+                autoscaler.close()
+            driver_pool.close()
+            if results_stream is not None:
+                results_stream.close()
+            profile_manager.close()
+            # Drains each queue, does the final flush and applies deferred row deletions
+            for job in jobs:
+                job['writer'].close()
         
         end_time = time.time()
         total_time = end_time - start_time
         
-        # Final flush of any remaining pending updates
-        if pending_updates:
-            try:
-                client = get_google_sheets_client(credentials_file)
-                if client:
-                    sheet = client.open(sheet_name)
-                    worksheet = sheet.worksheet(worksheet_name)
-                    flush_pending_updates(worksheet)
-                    logger.info("Flushed remaining pending updates")
-            except Exception as e:
-                logger.error(f"Error flushing final updates: {e}")
+        # Summary: skipped (fresh), refreshed and failed are counted separately
+        totals = {'skipped': 0, 'refreshed': 0, 'failed': 0, 'resumed': 0, 'rejected': 0}
+        target_counts = {}
+        for job in jobs:
+            refreshed = sum(1 for canonical_url, _, _ in job['members'] if page_results.get(canonical_url) is not None)
+            counts = {
+                'skipped': len(job['skipped']),
+                'refreshed': refreshed,
+                'failed': len(job['urls']) - refreshed,
+                'resumed': job['resumed'],
+                'rejected': len(job['rejected'])
+            }
+            for key, value in counts.items():
+                totals[key] += value
+            target_counts[job['target'].get('name', job['target']['sheet_name'])] = counts
+            logger.info(f"Target '{job['target'].get('name', job['target']['sheet_name'])}': "
+                        f"{counts['refreshed']} refreshed, {counts['skipped']} skipped (fresh), {counts['failed']} failed, "
+                        f"{counts['resumed']} resumed from journal, {counts['rejected']} rejected")
+        logger.info(f"Processing complete. {totals['refreshed']}/{total_urls} URLs processed successfully "
+                    f"from {len(page_results)} page loads in {total_time:.2f} seconds "
+                    f"({totals['refreshed']} refreshed, {totals['skipped']} skipped, {totals['failed']} failed, "
+                    f"{totals['resumed']} resumed, {totals['rejected']} rejected)")
+        write_run_report(
+            targets=target_counts,
+            totals=dict(totals, page_loads=len(page_results), seconds=round(total_time, 3)),
+            shard=f"{shard[0]}/{shard[1]}" if shard is not None else None
+        )
         
-        # Summary
-        successful_extractions = sum(1 for result in results if result is not None)
-        logger.info(f"Processing complete. {successful_extractions}/{len(urls)} URLs processed successfully in {total_time:.2f} seconds")
+        # Once every result is in the sheet the next run starts fresh;
+        # otherwise it replays whatever didn't make it
+        write_failed = any(job['writer'].write_errors for job in jobs)
+        if journal:
+            if write_failed:
+                logger.warning(f"Some sheet writes failed; keeping {journal.path} for the next run to replay")
+            else:
+                journal.complete()
+        elif write_failed and shard is not None:
+            logger.error(f"Some results could not be saved to {results_file}; the merge will miss them")
+        return not write_failed
         
     except Exception as e:
         logger.error(f"Error processing URLs from sheets: {e}")
+        return False
+    
+    finally:
+        if journal:
+            journal.close()
+
+
+def process_urls_from_sheets(sheet_name, worksheet_name, credentials_file, max_workers=2, tabs_per_browser=TABS_PER_BROWSER, url_header=URL_HEADER, ad_count_header=AD_COUNT_HEADER, freshness_ttl_hours=FRESHNESS_TTL_HOURS, journal_file=JOURNAL_FILE, ads_data_file=ADS_DATA_FILE):
+    """
+    Process URLs from Google Sheets to extract ad counts.
+    If a previous run was interrupted, it resumes from journal_file.
+    """
+    target = {
+        'name': worksheet_name,
+        'sheet_name': sheet_name,
+        'worksheet_name': worksheet_name,
+        'url_header': url_header,
+        'ad_count_header': ad_count_header
+    }
+    process_targets([target], credentials_file, max_workers=max_workers, tabs_per_browser=tabs_per_browser, freshness_ttl_hours=freshness_ttl_hours, journal_file=journal_file, ads_data_file=ads_data_file)
+
+
+def load_shard_results(paths):
+    """
+    Read shard results files (or directories of them) into
+    target key -> {(url, row_number): (ad_count, competitor_name)}.
+    A result repeated across files is kept once.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            # Downloaded artifacts land one directory per shard
+            files.extend(sorted(glob.glob(os.path.join(path, '**', '*.jsonl'), recursive=True)))
+        else:
+            files.append(path)
+    
+    results = {}
+    for results_file in files:
+        with open(results_file, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping unreadable line in {results_file}")
+                    continue
+                results.setdefault(entry['target'], {})[(entry['url'], entry['row'])] = (
+                    entry['ad_count'], entry.get('competitor_name'))
+    logger.info(f"Loaded {sum(len(entries) for entries in results.values())} shard results from {len(files)} file(s)")
+    return results
+
+
+def merge_shard_results(paths, targets, credentials_file, journal_file=MERGE_JOURNAL_FILE):
+    """
+    Apply every shard's results to the sheets in one place, exactly once.
+    Each target gets a fresh snapshot and one SheetWriter, so cell writes are
+    batched as usual and row deletions run once, after all writes.
+    With a journal_file, results are journaled as they are committed and a
+    re-run of the same merge skips them, so no streak is counted twice. The
+    journal is kept after a successful merge for the same reason.
+    """
+    results = load_shard_results(paths)
+    known = {journal_key(target) for target in targets}
+    for key in results:
+        if key not in known:
+            logger.warning(f"Shard results for unknown target '{key}' were not merged")
+    
+    journal = None
+    if journal_file:
+        try:
+            journal = RunJournal(journal_file)
+            if journal.resumed:
+                logger.info(f"Resuming merge {journal.run_id} from {journal_file}")
+        except Exception as e:
+            logger.error(f"Could not open merge journal {journal_file}: {e}")
+            return False
+    
+    writers = []
+    for target in targets:
+        entries = results.get(journal_key(target))
+        if journal and entries:
+            applied = journal.committed_rows(journal_key(target))
+            entries = {key: value for key, value in entries.items() if key not in applied}
+            if applied:
+                logger.info(f"Skipping {len(applied)} results for '{journal_key(target)}' applied by an earlier merge")
+        if not entries:
+            continue
+        snapshot = load_worksheet_snapshot(
+            target['sheet_name'], target['worksheet_name'], credentials_file,
+            url_header=target.get('url_header', URL_HEADER),
+            ad_count_header=target.get('ad_count_header', AD_COUNT_HEADER)
+        )
+        if snapshot is None:
+            logger.error(f"Could not load worksheet snapshot for '{target['sheet_name']}' / '{target['worksheet_name']}'")
+            continue
+        writer = SheetWriter(target['sheet_name'], target['worksheet_name'], credentials_file, snapshot, journal=journal)
+        writer.start()
+        # Results an earlier attempt journaled but didn't commit keep the streak they were staged from
+        journaled = {(item[0], item[3]): item[4] for item in journal.pending_results(journal_key(target))} if journal else {}
+        for (url, row_number), (ad_count, competitor_name) in entries.items():
+            if (url, row_number) in journaled:
+                writer.submit(url, ad_count, competitor_name, row_number, streak=journaled[(url, row_number)], replay=True)
+            else:
+                writer.submit(url, ad_count, competitor_name, row_number)
+        writers.append((target, writer))
+    
+    # Drains each queue, does the final flush and applies deferred row deletions
+    for target, writer in writers:
+        writer.close()
+        logger.info(f"Merged target '{target.get('name', target['sheet_name'])}': {writer.written} written, {writer.failed} failed")
+    if journal:
+        journal.close()
+    return all(writer.write_errors == 0 for _, writer in writers)
 
 
-def main():
-    """Main function to run the scraper - configured for GitHub Actions."""
+def main(default_targets=('debt',)):
+    """
+    Main function to run the scraper - configured for GitHub Actions.
+    Targets come from TARGETS_FILE; the TARGETS env var picks which ones
+    (comma-separated names, or 'all') and defaults to default_targets.
+    --shard i/N scrapes one shard into a results file; --merge applies
+    the shard results files to the sheets.
+    """
+    parser = argparse.ArgumentParser(description="Facebook Ads Library ad count scraper")
+    parser.add_argument('--shard', default=os.getenv("SHARD"),
+                        help="scrape only shard i of N (0-based, e.g. 0/3); results go to a file for --merge")
+    parser.add_argument('--shard-results', default=None,
+                        help=f"results file for --shard (default: {SHARD_RESULTS_FILE})")
+    parser.add_argument('--merge', nargs='+', metavar='PATH',
+                        help="apply shard results files (or directories of them) to the sheets")
+    args = parser.parse_args()
+    
+    # Keep a copy of the log with the run artifacts
+    try:
+        os.makedirs(LOGS_DIR, exist_ok=True)
+        file_handler = logging.FileHandler(LOG_FILE)
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logging.getLogger().addHandler(file_handler)
+    except OSError as e:
+        logger.warning(f"Could not open log file {LOG_FILE}: {e}")
+    
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+    results_file = None
+    if shard:
+        results_file = args.shard_results or SHARD_RESULTS_FILE.format(index=shard[0], count=shard[1])
     
     # Default configuration for GitHub Actions
-    sheet_name = 'Debt 2025 Swipe File '
-    worksheet_name = 'Milk'
+    targets_file = os.getenv("TARGETS_FILE", TARGETS_FILE)
+    target_names = [name.strip() for name in os.getenv("TARGETS", ",".join(default_targets)).split(",") if name.strip()]
     credentials_file = 'credentials.json'
     max_workers = int(os.getenv("MAX_WORKERS", "2"))  # Allow override via environment variable
     
+    try:
+        targets = load_targets(targets_file, target_names)
+    except Exception as e:
+        logger.error(f"Could not load targets from {targets_file}: {e}")
+        sys.exit(1)
+    
     logger.info("Starting Facebook Ad Count Scraper (GitHub Actions Mode)")
-    logger.info(f"Sheet: {sheet_name}")
-    logger.info(f"Worksheet: {worksheet_name}")
+    for target in targets:
+        logger.info(f"Target '{target['name']}': sheet '{target['sheet_name']}', worksheet '{target['worksheet_name']}'")
     logger.info(f"Credentials: {credentials_file}")
-    logger.info(f"Max Workers: {max_workers}")
+    logger.info(f"Max Workers: {max_workers}{f' (autoscaling {MIN_WORKERS}-{max(max_workers, AUTOSCALE_MAX_WORKERS)})' if AUTOSCALE else ''}")
+    logger.info(f"Tabs per browser: {TABS_PER_BROWSER}")
+    logger.info(f"Block heavy resources: {BLOCK_HEAVY_RESOURCES}")
+    logger.info(f"Freshness TTL: {f'{FRESHNESS_TTL_HOURS:g} hours' if FRESHNESS_TTL_HOURS > 0 else 'off'}")
     
     # Check if credentials file exists
     if not os.path.exists(credentials_file):
@@ -599,13 +2851,28 @@ def main():
         sys.exit(1)
     
     try:
-        # Process URLs from Google Sheets
-        process_urls_from_sheets(
-            sheet_name=sheet_name,
-            worksheet_name=worksheet_name,
+        if args.merge:
+            # Final step of a sharded run: write every shard's results once
+            merged = merge_shard_results(args.merge, targets, credentials_file)
+            write_run_report(mode='merge')
+            if not merged:
+                logger.error("Some merged writes failed")
+                sys.exit(1)
+            logger.info("Merge completed successfully")
+            return
+        
+        # Process URLs from every target in one process
+        completed = process_targets(
+            targets=targets,
             credentials_file=credentials_file,
-            max_workers=max_workers
+            max_workers=max_workers,
+            shard=shard,
+            results_file=results_file
         )
+        if shard and not completed:
+            # A shard's results only reach the sheet through its results file
+            logger.error("Shard did not save all of its results")
+            sys.exit(1)
         logger.info("Script completed successfully")
         
     except Exception as e:
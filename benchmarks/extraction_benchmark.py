@@ -0,0 +1,199 @@
+"""
+Offline benchmark for the Ads Library extraction logic.
+
+Serves the saved HTML snapshots in benchmarks/fixtures from a local HTTP
+server, loads each one into headless Chrome and runs the same page-state wait
+and in-page extractor the scraper uses. Every extraction strategy is also run
+on its own, so the report shows per-strategy latency and accuracy across the
+corpus without touching Facebook.
+
+Usage:
+    python benchmarks/extraction_benchmark.py [--iterations 5] [--driver-path PATH] [--json report.json]
+"""
+import argparse
+import functools
+import http.server
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webdriver_manager.chrome import ChromeDriverManager
+
+from Ad_details_scraper import (
+    EXTRACT_PAGE_SCRIPT,
+    EXTRACTION_STRATEGIES,
+    ProfileManager,
+    create_chrome_driver,
+    dismiss_popups,
+    interpret_extraction,
+    logger,
+    quit_driver,
+    wait_for_page_state,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Static file handler that doesn't log every request."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(directory):
+    """Serve the fixture directory on a free localhost port. Returns (server, base_url)."""
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def load_expected(directory):
+    """Return the fixture name -> expected outcome map from expected.json."""
+    with open(os.path.join(directory, 'expected.json')) as f:
+        return json.load(f)
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {'n': 0}
+    ordered = sorted(samples)
+    return {
+        'n': len(ordered),
+        'p50_ms': round(statistics.median(ordered) * 1000, 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+def run_fixture(driver, url, name, expected, iterations, timings, outcomes):
+    """
+    Load one fixture `iterations` times and time each phase and strategy.
+    Per-strategy outcomes record whether the strategy matched and whether its
+    count was right; the full cascade is also checked for competitor name,
+    state and winning strategy.
+    """
+    for _ in range(iterations):
+        start = time.perf_counter()
+        driver.get(url)
+        timings['driver.get'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        state = wait_for_page_state(driver, name, timeout=5)
+        timings['page_state'].append(time.perf_counter() - start)
+        outcomes['page_state'].append(state == expected['state'])
+
+        if state not in ('login', 'error', 'no_ads'):
+            start = time.perf_counter()
+            dismiss_popups(driver, name)
+            timings['popups'].append(time.perf_counter() - start)
+
+        # Each strategy on its own
+        for strategy in EXTRACTION_STRATEGIES:
+            start = time.perf_counter()
+            result = driver.execute_script(EXTRACT_PAGE_SCRIPT, [strategy])
+            timings[strategy].append(time.perf_counter() - start)
+            count, _, matched = interpret_extraction(result, url)
+            if matched:
+                outcomes[strategy].append(count == expected['count'])
+
+        # The full cascade, as the scraper runs it
+        start = time.perf_counter()
+        result = driver.execute_script(EXTRACT_PAGE_SCRIPT)
+        timings['cascade'].append(time.perf_counter() - start)
+        count, competitor, matched = interpret_extraction(result, url)
+        if expected['state'] in ('login', 'error'):
+            # The scraper never extracts from these pages
+            correct = state == expected['state']
+        else:
+            correct = (
+                count == expected['count']
+                and competitor == expected['competitor']
+                and matched == expected['strategy']
+            )
+        outcomes['cascade'].append(correct)
+        if not correct:
+            logger.warning(f"Cascade mismatch on {name}: state={state} count={count} "
+                           f"competitor={competitor!r} strategy={matched}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=5, help='loads per fixture')
+    parser.add_argument('--driver-path', help='chromedriver path (default: install via webdriver-manager)')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='fixture directory with expected.json')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    expected = load_expected(args.fixtures)
+    driver_path = args.driver_path or ChromeDriverManager().install()
+    server, base_url = start_fixture_server(args.fixtures)
+    profile_manager = ProfileManager(max_profiles=1, reuse=False)
+    profile_dir = profile_manager.acquire()
+    driver = create_chrome_driver(driver_path, profile_dir, block_resources=True)
+
+    phases = ['driver.get', 'page_state', 'popups', 'cascade'] + EXTRACTION_STRATEGIES
+    timings = {phase: [] for phase in phases}
+    outcomes = {phase: [] for phase in ['page_state', 'cascade'] + EXTRACTION_STRATEGIES}
+    per_fixture = {}
+
+    try:
+        for name in sorted(expected):
+            fixture_timings = {phase: [] for phase in phases}
+            fixture_outcomes = {phase: [] for phase in outcomes}
+            run_fixture(driver, f"{base_url}/{name}", name, expected[name], args.iterations,
+                        fixture_timings, fixture_outcomes)
+            for phase in phases:
+                timings[phase].extend(fixture_timings[phase])
+            for phase in outcomes:
+                outcomes[phase].extend(fixture_outcomes[phase])
+            per_fixture[name] = {
+                'cascade_ms': summarize(fixture_timings['cascade']).get('p50_ms'),
+                'correct': all(fixture_outcomes['cascade']),
+            }
+    finally:
+        quit_driver(driver)
+        profile_manager.close()
+        server.shutdown()
+
+    report = {
+        'iterations': args.iterations,
+        'fixtures': per_fixture,
+        'latency': {phase: summarize(timings[phase]) for phase in phases},
+        'accuracy': {
+            phase: {
+                'matched': len(results),
+                'correct': sum(results),
+                'accuracy': round(sum(results) / len(results), 3) if results else None,
+            }
+            for phase, results in outcomes.items()
+        },
+    }
+
+    print(f"{'phase':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'matched':>9}{'accuracy':>10}")
+    for phase in phases:
+        latency = report['latency'][phase]
+        accuracy = report['accuracy'].get(phase, {})
+        print(f"{phase:<14}{latency['n']:>6}{latency.get('p50_ms', '-'):>10}{latency.get('p95_ms', '-'):>10}"
+              f"{latency.get('max_ms', '-'):>10}{accuracy.get('matched', '-'):>9}{str(accuracy.get('accuracy', '-')):>10}")
+    print()
+    for name, result in per_fixture.items():
+        print(f"{name:<28}{'ok' if result['correct'] else 'MISMATCH':<10}{result['cascade_ms']} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return 0 if all(result['correct'] for result in per_fixture.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
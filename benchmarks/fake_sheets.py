@@ -0,0 +1,276 @@
+"""
+In-process stand-in for the parts of the gspread API the scraper uses.
+
+FakeSheetsBackend holds spreadsheets and worksheets in memory and puts every
+call through the same gate: optional latency, per-minute read and write
+quotas enforced over a sliding 60 second window, and random 429 injection.
+Quota overruns and injected errors raise a real gspread APIError with status
+429, so rate_limited_api_call sees exactly what the live API would send.
+Every call is counted by type.
+
+install() plugs a backend into Ad_details_scraper's Sheets session cache, so
+get_worksheet() and everything above it run unchanged against the fake.
+"""
+import collections
+import json
+import random
+import threading
+import time
+from datetime import datetime
+
+import gspread
+from gspread.utils import a1_range_to_grid_range
+from requests.models import Response
+
+# Method names that count against the write quota (same split as the live API)
+SHEETS_EPOCH = datetime(1899, 12, 30)  # day 0 of Sheets date serial numbers
+WRITE_CALLS = {'batch_update', 'update_cell', 'update', 'update_cells', 'append_row', 'append_rows', 'delete_rows'}
+
+
+class FakeSheetsBackend:
+    """
+    Shared state for every fake spreadsheet: latency, quotas and call counts.
+
+    latency is seconds added to each call (plus up to `jitter` more at random),
+    read_quota / write_quota are requests per minute (None for unlimited),
+    error_rate is the chance that any call fails with an injected 429, and
+    retry_after, if set, is sent as the Retry-After header on 429 responses.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, read_quota=60, write_quota=60, error_rate=0.0, retry_after=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.quotas = {'read': read_quota, 'write': write_quota}
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.windows = {'read': collections.deque(), 'write': collections.deque()}
+        self.calls = collections.Counter()  # 'worksheet.batch_update' -> n, including rejected calls
+        self.rate_limited = collections.Counter()  # same keys, calls answered with a 429
+        self.cells_written = 0
+        self.rows_deleted = 0
+        self.spreadsheets = {}
+
+    def add_spreadsheet(self, title):
+        spreadsheet = FakeSpreadsheet(self, title, len(self.spreadsheets) + 1)
+        self.spreadsheets[title] = spreadsheet
+        return spreadsheet
+
+    def call(self, kind, method):
+        """Account for one API request, sleeping for latency and raising a 429 if it is refused."""
+        key = f"{kind}.{method}"
+        quota_type = 'write' if method in WRITE_CALLS else 'read'
+        with self.lock:
+            self.calls[key] += 1
+            now = time.monotonic()
+            window = self.windows[quota_type]
+            while window and now - window[0] >= 60:
+                window.popleft()
+            quota = self.quotas[quota_type]
+            if quota is not None and len(window) >= quota:
+                refused = f"Quota exceeded for quota metric '{quota_type.title()} requests' (per minute per user)"
+            elif self.error_rate and self.random.random() < self.error_rate:
+                refused = "Injected rate limit error"
+            else:
+                refused = None
+                window.append(now)
+            if refused:
+                self.rate_limited[key] += 1
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+        if delay:
+            time.sleep(delay)
+        if refused:
+            raise rate_limit_error(refused, self.retry_after)
+
+    def report(self):
+        with self.lock:
+            return {
+                'calls': dict(self.calls),
+                'rate_limited': dict(self.rate_limited),
+                'total_calls': sum(self.calls.values()),
+                'total_rate_limited': sum(self.rate_limited.values()),
+                'cells_written': self.cells_written,
+                'rows_deleted': self.rows_deleted,
+            }
+
+
+def api_error(code, status, message, headers=None):
+    """Build the gspread APIError the live API raises for an error response."""
+    response = Response()
+    response.status_code = code
+    response._content = json.dumps({
+        'error': {'code': code, 'message': message, 'status': status}
+    }).encode('utf-8')
+    response.headers.update(headers or {})
+    return gspread.exceptions.APIError(response)
+
+
+def rate_limit_error(message, retry_after=None):
+    """A 429, with a Retry-After header if given."""
+    headers = {'Retry-After': str(retry_after)} if retry_after is not None else None
+    return api_error(429, 'RESOURCE_EXHAUSTED', message, headers)
+
+
+def bad_request(message):
+    """A 400 for requests the fake doesn't support."""
+    return api_error(400, 'INVALID_ARGUMENT', message)
+
+
+def unformatted(value):
+    """
+    What UNFORMATTED_VALUE returns for a cell written with USER_ENTERED:
+    numbers as numbers and '%Y-%m-%d[ %H:%M[:%S]]' dates as serial numbers.
+    """
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return (datetime.strptime(value, fmt) - SHEETS_EPOCH).total_seconds() / 86400
+        except ValueError:
+            pass
+    return value
+
+
+class FakeClient:
+    """Stand-in for gspread.Client: opens spreadsheets by title."""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def open(self, title):
+        self.backend.call('client', 'open')
+        try:
+            return self.backend.spreadsheets[title]
+        except KeyError:
+            raise gspread.exceptions.SpreadsheetNotFound(title)
+
+
+class FakeSpreadsheet:
+    """Stand-in for gspread.Spreadsheet: worksheet lookup and deleteDimension batch updates."""
+
+    def __init__(self, backend, title, spreadsheet_id):
+        self.backend = backend
+        self.title = title
+        self.id = f"fake-spreadsheet-{spreadsheet_id}"
+        self.worksheets = {}
+
+    def add_worksheet(self, title, rows):
+        worksheet = FakeWorksheet(self, title, len(self.worksheets), rows)
+        self.worksheets[title] = worksheet
+        return worksheet
+
+    def worksheet(self, title):
+        self.backend.call('spreadsheet', 'worksheet')
+        try:
+            return self.worksheets[title]
+        except KeyError:
+            raise gspread.exceptions.WorksheetNotFound(title)
+
+    def batch_update(self, body):
+        self.backend.call('spreadsheet', 'batch_update')
+        by_id = {worksheet.id: worksheet for worksheet in self.worksheets.values()}
+        for request in body.get('requests', []):
+            if 'deleteDimension' not in request:
+                raise bad_request(f"Fake spreadsheet only supports deleteDimension, got {list(request)}")
+            grid = request['deleteDimension']['range']
+            if grid['dimension'] != 'ROWS':
+                raise bad_request("Fake spreadsheet only deletes rows")
+            worksheet = by_id[grid['sheetId']]
+            with worksheet.lock:
+                deleted = len(worksheet.rows[grid['startIndex']:grid['endIndex']])
+                del worksheet.rows[grid['startIndex']:grid['endIndex']]
+            with self.backend.lock:
+                self.backend.rows_deleted += deleted
+        return {'spreadsheetId': self.id, 'replies': [{} for _ in body.get('requests', [])]}
+
+
+class FakeWorksheet:
+    """
+    Stand-in for gspread.Worksheet backed by a list of string rows (row 1 is
+    the header). Values are stored the way get_all_values returns them.
+    """
+
+    def __init__(self, spreadsheet, title, worksheet_id, rows):
+        self.spreadsheet = spreadsheet
+        self.backend = spreadsheet.backend
+        self.title = title
+        self.id = worksheet_id
+        self.lock = threading.Lock()
+        self.rows = [[str(value) for value in row] for row in rows]
+
+    def _set(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        while len(cells) < col:
+            cells.append('')
+        cells[col - 1] = '' if value is None else str(value)
+
+    def get_all_values(self, value_render_option=None, **kwargs):
+        self.backend.call('worksheet', 'get_all_values')
+        with self.lock:
+            width = max((len(row) for row in self.rows), default=0)
+            values = [row + [''] * (width - len(row)) for row in self.rows]
+        if value_render_option == 'UNFORMATTED_VALUE':
+            values = [[unformatted(value) for value in row] for row in values]
+        return values
+
+    def col_values(self, col):
+        self.backend.call('worksheet', 'col_values')
+        with self.lock:
+            values = [row[col - 1] if col <= len(row) else '' for row in self.rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def cell(self, row, col):
+        self.backend.call('worksheet', 'cell')
+        with self.lock:
+            cells = self.rows[row - 1] if row <= len(self.rows) else []
+            value = cells[col - 1] if col <= len(cells) else ''
+        return gspread.cell.Cell(row, col, value)
+
+    def update_cell(self, row, col, value):
+        self.backend.call('worksheet', 'update_cell')
+        with self.lock:
+            self._set(row, col, value)
+        with self.backend.lock:
+            self.backend.cells_written += 1
+
+    def batch_update(self, data, value_input_option=None, **kwargs):
+        self.backend.call('worksheet', 'batch_update')
+        written = 0
+        with self.lock:
+            for entry in data:
+                grid = a1_range_to_grid_range(entry['range'])
+                for row_offset, values in enumerate(entry['values']):
+                    for col_offset, value in enumerate(values):
+                        self._set(grid['startRowIndex'] + 1 + row_offset, grid.get('startColumnIndex', 0) + 1 + col_offset, value)
+                        written += 1
+        with self.backend.lock:
+            self.backend.cells_written += written
+        return {'totalUpdatedCells': written}
+
+
+class FakeCredentials:
+    """Always-valid credentials, so the scraper never tries to refresh a token."""
+
+    valid = True
+
+
+def install(backend, scraper, credentials_file='fake-credentials.json'):
+    """
+    Route the scraper's Sheets session for credentials_file to the backend and
+    drop any cached spreadsheet or worksheet handles. Returns credentials_file.
+    """
+    with scraper.sheets_session_lock:
+        scraper.sheets_clients[credentials_file] = (FakeCredentials(), FakeClient(backend))
+        for cache in (scraper.spreadsheet_cache, scraper.worksheet_cache):
+            for key in [key for key in cache if key[0] == credentials_file]:
+                del cache[key]
+    return credentials_file
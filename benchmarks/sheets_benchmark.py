@@ -0,0 +1,180 @@
+"""
+Offline load test for the Sheets write path.
+
+Builds a synthetic worksheet in benchmarks/fake_sheets.py's in-process
+backend, plugs it into the scraper's Sheets session and pushes a scraped
+result for every row through the same code the scraper runs: one snapshot
+read, then either the SheetWriter pipeline (as process_targets uses it) or the
+standalone update_sheets_with_ad_count path. The report shows wall time,
+rows per second, API calls by type, 429s and the scraper's own per-phase
+timings, and checks the final sheet against the expected counts.
+
+Usage:
+    python benchmarks/sheets_benchmark.py [--rows 10000] [--path writer|standalone] [--latency 0.2]
+        [--read-quota 60] [--write-quota 60] [--error-rate 0.01] [--json report.json]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ad_details_scraper as scraper
+from fake_sheets import FakeSheetsBackend, install
+
+SHEET_NAME = 'Benchmark'
+WORKSHEET_NAME = 'Ads'
+HEADERS = ['Competitor', scraper.URL_HEADER, scraper.AD_COUNT_HEADER, scraper.ZERO_STREAK_HEADER, scraper.LAST_UPDATE_HEADER]
+
+
+def build_rows(count, duplicate_rate, expiring_rate, rng):
+    """
+    Header plus `count` rows of Ads Library URLs with random streaks and
+    timestamps. duplicate_rate of the rows repeat an earlier URL and
+    expiring_rate sit at a streak of 29, one zero-ad day away from deletion.
+    """
+    rows = [HEADERS]
+    now = datetime.now()
+    for index in range(count):
+        if index and rng.random() < duplicate_rate:
+            url = rows[rng.randint(1, index)][1]
+        else:
+            url = f"https://www.facebook.com/ads/library/?active_status=all&ad_type=all&country=ALL&view_all_page_id={100000 + index}"
+        streak = 29 if rng.random() < expiring_rate else rng.choice([0, 0, 0, 1, 5])
+        updated = (now - timedelta(hours=rng.randint(1, 72))).strftime(scraper.TIMESTAMP_FORMAT)
+        rows.append([f"Competitor {index}", url, str(rng.randint(0, 500)), str(streak), updated])
+    return rows
+
+
+def scrape_results(urls, zero_rate, rng):
+    """A synthetic ad count for every (url, row) pair; a URL gets the same count on every row."""
+    counts = {}
+    for url, _ in urls:
+        if url not in counts:
+            counts[url] = 0 if rng.random() < zero_rate else rng.randint(1, 500)
+    return [(url, counts[url], row) for url, row in urls], counts
+
+
+def run_writer(results, credentials_file, snapshot):
+    writer = scraper.SheetWriter(SHEET_NAME, WORKSHEET_NAME, credentials_file, snapshot)
+    writer.start()
+    for url, ad_count, row in results:
+        writer.submit(url, ad_count, 'benchmark', row)
+    writer.close()
+    return {'written': writer.written, 'failed': writer.failed, 'write_errors': writer.write_errors}
+
+
+def run_standalone(results, credentials_file, snapshot):
+    failed = 0
+    for url, ad_count, row in results:
+        if not scraper.update_sheets_with_ad_count(SHEET_NAME, WORKSHEET_NAME, credentials_file, url, ad_count, 'benchmark', row, snapshot=snapshot):
+            failed += 1
+    worksheet = scraper.get_worksheet(SHEET_NAME, WORKSHEET_NAME, credentials_file)
+    scraper.flush_pending_updates(worksheet)
+    scraper.apply_pending_deletions(worksheet, snapshot)
+    return {'written': len(results) - failed, 'failed': failed}
+
+
+def verify(worksheet, counts):
+    """Count surviving rows whose ad count doesn't match the synthetic result for their URL."""
+    url_col = HEADERS.index(scraper.URL_HEADER)
+    count_col = HEADERS.index(scraper.AD_COUNT_HEADER)
+    mismatched = 0
+    for row in worksheet.rows[1:]:
+        url = row[url_col].strip()
+        if url in counts and row[count_col] != str(counts[url]):
+            mismatched += 1
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='data rows in the synthetic worksheet')
+    parser.add_argument('--path', choices=['writer', 'standalone'], default='writer', help='write path to exercise')
+    parser.add_argument('--duplicate-rate', type=float, default=0.02, help='share of rows repeating an earlier URL')
+    parser.add_argument('--expiring-rate', type=float, default=0.01, help='share of rows at a streak of 29')
+    parser.add_argument('--zero-rate', type=float, default=0.3, help='share of URLs scraped with zero ads')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds added to every fake API call')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra seconds per call')
+    parser.add_argument('--read-quota', type=int, default=60, help='fake backend reads per minute (0 for unlimited)')
+    parser.add_argument('--write-quota', type=int, default=60, help='fake backend writes per minute (0 for unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='chance of an injected 429 on any call')
+    parser.add_argument('--retry-after', type=float, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--client-quota', type=int, help='override the scraper\'s read and write quotas per minute')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--verbose', action='store_true', help='keep the scraper\'s per-row info logging')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        scraper.logger.setLevel(logging.WARNING)
+    if args.client_quota:
+        scraper.read_bucket = scraper.TokenBucket('read', args.client_quota)
+        scraper.write_bucket = scraper.TokenBucket('write', args.client_quota)
+
+    rng = random.Random(args.seed)
+    backend = FakeSheetsBackend(
+        latency=args.latency,
+        jitter=args.jitter,
+        read_quota=args.read_quota or None,
+        write_quota=args.write_quota or None,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    worksheet = backend.add_spreadsheet(SHEET_NAME).add_worksheet(
+        WORKSHEET_NAME, build_rows(args.rows, args.duplicate_rate, args.expiring_rate, rng))
+    credentials_file = install(backend, scraper)
+
+    start = time.perf_counter()
+    snapshot = scraper.load_worksheet_snapshot(SHEET_NAME, WORKSHEET_NAME, credentials_file)
+    if snapshot is None:
+        print("Could not load the worksheet snapshot", file=sys.stderr)
+        return 1
+    urls = scraper.get_urls_from_sheets(SHEET_NAME, WORKSHEET_NAME, credentials_file, snapshot)
+    results, counts = scrape_results(urls, args.zero_rate, rng)
+    run = run_writer if args.path == 'writer' else run_standalone
+    outcome = run(results, credentials_file, snapshot)
+    elapsed = time.perf_counter() - start
+
+    api = backend.report()
+    report = {
+        'rows': args.rows,
+        'path': args.path,
+        'elapsed_s': round(elapsed, 3),
+        'rows_per_s': round(len(results) / elapsed, 1) if elapsed else None,
+        'results': outcome,
+        'api': api,
+        'api_calls_per_1k_rows': round(api['total_calls'] * 1000 / max(len(results), 1), 2),
+        'mismatched_rows': verify(worksheet, counts),
+        'rows_left': len(worksheet.rows) - 1,
+        'scraper_metrics': scraper.metrics.report(),
+    }
+
+    print(f"{args.rows} rows via {args.path}: {report['elapsed_s']}s, {report['rows_per_s']} rows/s")
+    print(f"{api['total_calls']} API calls ({report['api_calls_per_1k_rows']} per 1k rows), "
+          f"{api['total_rate_limited']} answered with 429, {api['cells_written']} cells written, "
+          f"{api['rows_deleted']} rows deleted")
+    print(f"{'call':<28}{'calls':>8}{'429s':>8}")
+    for call in sorted(api['calls']):
+        print(f"{call:<28}{api['calls'][call]:>8}{api['rate_limited'].get(call, 0):>8}")
+    phases = report['scraper_metrics']['phases']
+    print(f"{'phase':<40}{'n':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for phase, summary in phases.items():
+        print(f"{phase:<40}{summary['n']:>8}{summary['p50_ms']:>10}{summary['p95_ms']:>10}{summary['max_ms']:>10}")
+    print(f"{report['mismatched_rows']} surviving rows with the wrong ad count")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return 0 if report['mismatched_rows'] == 0 and not outcome.get('write_errors') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())